@@ -0,0 +1,113 @@
+# global imports
+import io
+import os
+import sys
+import bz2
+import gzip
+import lzma
+import argparse
+
+# compressions by file name extension
+EXTENSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+# compressions by the first bytes of a file
+MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+
+
+def compression_of(filename):
+    """return the compression given by the extension of filename, or None"""
+    return EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+
+def open_stream(file, mode, compression):
+    """return a binary stream (de)compressing a binary file object
+    The file object is not closed with the stream.
+    :param file: a binary file object
+    :param mode: "r" or "w"
+    :param compression: "gzip", "bz2", "xz" or "zstd"
+    """
+    if compression == "gzip":
+        # zlib's default level, much faster than gzip's 9 for a few % more
+        return gzip.GzipFile(fileobj=file, mode=mode + "b", compresslevel=6)
+    if compression == "bz2":
+        return bz2.BZ2File(file, mode + "b")
+    if compression == "xz":
+        return lzma.LZMAFile(file, mode + "b")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise OSError("the zstandard package is required for zstd compression")
+        return zstandard.open(file, mode + "b", closefd=False)
+    raise ValueError("unknown compression %s" % compression)
+
+
+class CompressedFile(io.TextIOWrapper):
+    """Text file (de)compressing a file opened by argparse or by the user
+    Closing it ends the compressed stream, then closes the file, except
+    stdin and stdout which are only flushed.
+    :param file: a text file object with a binary buffer
+    :param mode: "r" or "w"
+    :param compression: "gzip", "bz2", "xz" or "zstd"
+    """
+
+    def __init__(self, file, mode, compression):
+        super().__init__(open_stream(file.buffer, mode, compression), encoding="UTF-8")
+        self.file = file
+        self.compression = compression
+
+    @property
+    def name(self):
+        return self.file.name
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        if self.file in (sys.stdin, sys.stdout):
+            self.file.buffer.flush()
+        else:
+            self.file.close()
+
+
+def compress(file, compression):
+    """return file compressing what is written to it
+    :param file: a text file object opened for writing
+    :param compression: "gzip", "bz2", "xz", "zstd" or None for none
+    """
+    if not compression or isinstance(file, CompressedFile):
+        return file
+    file.flush()
+    return CompressedFile(file, "w", compression)
+
+
+def decompress(file):
+    """return file decompressed if its first bytes are those of a
+    compressed file, file itself otherwise
+    :param file: a text file object opened for reading
+    """
+    buffer = getattr(file, "buffer", None)
+    if isinstance(file, CompressedFile) or not hasattr(buffer, "peek"):
+        return file
+    head = buffer.peek(6)[:6]
+    for magic, compression in MAGIC:
+        if head.startswith(magic):
+            return CompressedFile(file, "r", compression)
+    return file
+
+
+class FileType(argparse.FileType):
+    """argparse.FileType for GEDCOM files, compressed when their name ends
+    with .gz, .bz2, .xz or .zst; compressed input is also recognised by its
+    first bytes, so stdin can be compressed too
+    """
+
+    def __call__(self, string):
+        file = super().__call__(string)
+        if "r" in self._mode:
+            return decompress(file)
+        return compress(file, compression_of(string))
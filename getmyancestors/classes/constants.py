@@ -3,6 +3,18 @@
 # Subject to change: see https://www.familysearch.org/developers/docs/api/tree/Persons_resource
 MAX_PERSONS = 200
 
+# number of locks shared by the objects of a Tree, see Tree.lock_for
+LOCK_STRIPES = 64
+
+# maximum length in bytes of a GEDCOM line value, and of a CONC or CONT value
+MAX_LINE = 255
+MAX_CONT = 248
+# characters a long line is never split next to
+SPACES = " \t\v"
+
+# records rendered by a process at a time when printing with several processes
+PRINT_CHUNK = 1000
+
 FACT_TAGS = {
     "http://gedcomx.org/Birth": "BIRT",
     "http://gedcomx.org/Christening": "CHR",
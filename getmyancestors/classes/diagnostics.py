@@ -0,0 +1,85 @@
+# global imports
+import sys
+import time
+import signal
+import threading
+import traceback
+
+
+def dump(fs=None, tree=None, file=sys.stderr):
+    """write the state of a running crawl without stopping it
+    :param fs: a Session object
+    :param tree: a Tree object
+    :param file: the output stream
+    """
+    now = time.time()
+    file.write(
+        "=== getmyancestors diagnostics %s ===\n" % time.strftime("%Y-%m-%d %H:%M:%S")
+    )
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    if fs:
+        file.write("\n--- Requests (phase: %s) ---\n" % fs.phase)
+        for ident, (state, url, since) in sorted(
+            list(fs.activity.items()), key=lambda x: x[1][2]
+        ):
+            file.write(
+                "%s: %s %s for %.1f s\n"
+                % (names.get(ident, ident), state, url, now - since)
+            )
+        scheduler = fs.scheduler
+        file.write(
+            "\n--- Scheduler ---\nconcurrency limit: %s, in flight: %s, "
+            "waiting for a slot: %s\n"
+            % (scheduler.limit, scheduler.in_flight, scheduler.waiting)
+        )
+        executor = getattr(fs.executor, "wrapped", fs.executor)
+        work_queue = getattr(executor, "_work_queue", None)
+        if work_queue is not None:
+            file.write("tasks queued in the executor: %s\n" % work_queue.qsize())
+    if tree:
+        file.write(
+            "\n--- Tree ---\nindividuals: %s, families: %s, sources: %s, "
+            "notes: %s, places: %s\n"
+            % (
+                len(tree.indi),
+                len(tree.fam),
+                len(tree.sources),
+                len(tree.notes),
+                len(tree.places),
+            )
+        )
+    if fs:
+        file.write("\n--- Metrics ---\n")
+        fs.metrics.to_json(file)
+    file.write("\n--- Threads ---\n")
+    for ident, frame in sys._current_frames().items():
+        file.write("\nThread %s (%s):\n" % (names.get(ident, "?"), ident))
+        file.write("".join(traceback.format_stack(frame)))
+    file.write("=== end of diagnostics ===\n")
+    file.flush()
+
+
+def install(fs=None, tree=None, filename=None):
+    """dump the diagnostics on SIGUSR1, where available
+    The signal handler runs in the main thread between two bytecodes, maybe
+    while it holds a lock the dump takes, so it only wakes up a thread
+    writing the dump.
+    :param filename: file to append the diagnostics to, stderr if None
+    """
+    if not hasattr(signal, "SIGUSR1"):
+        return False
+    requested = threading.Event()
+
+    def serve():
+        while True:
+            requested.wait()
+            requested.clear()
+            if filename:
+                with open(filename, "a", encoding="UTF-8") as file:
+                    dump(fs, tree, file)
+            else:
+                dump(fs, tree)
+
+    threading.Thread(target=serve, name="diagnostics", daemon=True).start()
+    signal.signal(signal.SIGUSR1, lambda signum, frame: requested.set())
+    return True
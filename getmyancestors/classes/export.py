@@ -0,0 +1,621 @@
+# global imports
+import os
+import re
+import sys
+import json
+import sqlite3
+import threading
+import importlib.util
+
+# kinds of individual ordinances, as Indi attributes
+ORDINANCE_KINDS = (
+    "baptism",
+    "confirmation",
+    "initiatory",
+    "endowment",
+    "sealing_child",
+)
+# first number of 3 or 4 digits of a GEDCOM date
+YEAR = re.compile(r"(?<!\d)(\d{3,4})(?!\d)")
+BIRTH = "http://gedcomx.org/Birth"
+DEATH = "http://gedcomx.org/Death"
+# signs of the hemispheres prefixed to GEDCOM coordinates
+HEMISPHERES = {"N": 1, "S": -1, "E": 1, "W": -1}
+# kinds of additional names, as Indi attributes
+NAME_KINDS = (
+    ("birth", "birthnames"),
+    ("nickname", "nicknames"),
+    ("aka", "aka"),
+    ("married", "married"),
+)
+
+
+def fid_key(key):
+    """sort key of fids and tuples of fids, some of them None"""
+    return tuple(x or "" for x in key) if isinstance(key, tuple) else key or ""
+
+
+def date_year(date):
+    """return the year of a GEDCOM date string, or None"""
+    match = YEAR.search(date) if date else None
+    return int(match.group(1)) if match else None
+
+
+def life_event(indi, typ):
+    """return the first fact of type typ of an individual with a date or a
+    place, or None
+    """
+    for fact in indi.facts:
+        if fact.type == typ and (fact.date or fact.place):
+            return fact
+    return None
+
+
+def coordinate(value):
+    """return a latitude or longitude as a float, either signed ("-2.3") or
+    with a GEDCOM hemisphere prefix ("W2.3")
+    """
+    value = value.strip()
+    sign = HEMISPHERES.get(value[:1].upper())
+    if sign is None:
+        return float(value)
+    return sign * float(value[1:])
+
+
+def coordinates(map):
+    """return the (latitude, longitude) of Fact.map as floats, or None"""
+    if not map:
+        return None
+    try:
+        return coordinate(map[0]), coordinate(map[1])
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def name_dict(name):
+    """return the normalized dict of a Name object"""
+    return {
+        "given": name.given,
+        "surname": name.surname,
+        "prefix": name.prefix,
+        "suffix": name.suffix,
+    }
+
+
+def fact_dict(fact):
+    """return the normalized dict of a Fact object"""
+    latitude, longitude = coordinates(fact.map) or (None, None)
+    return {
+        "type": fact.type,
+        "value": fact.value,
+        "date": fact.date,
+        "place": fact.place,
+        "latitude": latitude,
+        "longitude": longitude,
+        "note": fact.note.num if fact.note else None,
+    }
+
+
+def ordinance_dict(ordinance):
+    """return the normalized dict of an Ordinance object"""
+    return {
+        "date": ordinance.date,
+        "temple": ordinance.temple_code,
+        "status": ordinance.status,
+        "family": list(ordinance.famc.key) if ordinance.famc else None,
+    }
+
+
+def source_links(sources):
+    """return the normalized list of (Source, quote) links"""
+    return [
+        {"source": source.fid, "num": source.num, "page": quote}
+        for source, quote in sorted(sources, key=lambda x: x[0].num)
+    ]
+
+
+def person_dict(indi):
+    """return the normalized dict of an Indi object"""
+    return {
+        "type": "person",
+        "id": indi.fid,
+        "num": indi.num,
+        "gender": indi.gender,
+        "living": indi.living,
+        "name": name_dict(indi.name) if indi.name else None,
+        "names": [
+            dict(name_dict(name), type=kind)
+            for kind, attribute in NAME_KINDS
+            for name in getattr(indi, attribute)
+        ],
+        "facts": [fact_dict(fact) for fact in indi.facts],
+        "ordinances": {
+            kind: ordinance_dict(getattr(indi, kind))
+            for kind in ORDINANCE_KINDS
+            if getattr(indi, kind)
+        },
+        "parents": [list(x) for x in sorted(indi.famc_fid, key=fid_key)],
+        "families": [list(x) for x in sorted(indi.fams_fid, key=fid_key)],
+        "memories": [
+            {"description": memorie.description, "url": memorie.url}
+            for memorie in indi.memories
+        ],
+        "notes": sorted(note.num for note in indi.notes),
+        "sources": source_links(indi.sources),
+    }
+
+
+def family_dict(fam):
+    """return the normalized dict of a Fam object"""
+    return {
+        "type": "family",
+        "id": fam.fid,
+        "num": fam.num,
+        "husband": fam.husb_fid,
+        "wife": fam.wife_fid,
+        "children": sorted(fam.chil_fid, key=fid_key),
+        "facts": [fact_dict(fact) for fact in fam.facts],
+        "sealing": ordinance_dict(fam.sealing_spouse) if fam.sealing_spouse else None,
+        "notes": sorted(note.num for note in fam.notes),
+        "sources": source_links(fam.sources),
+    }
+
+
+def source_dict(source):
+    """return the normalized dict of a Source object"""
+    return {
+        "type": "source",
+        "id": source.fid,
+        "num": source.num,
+        "title": source.title,
+        "citation": source.citation,
+        "url": source.url,
+        "notes": sorted(note.num for note in source.notes),
+    }
+
+
+def note_dict(note):
+    """return the normalized dict of a Note object"""
+    return {"type": "note", "num": note.num, "text": note.text}
+
+
+# normalized dict functions, by Spool record kind
+DICTS = {
+    "indi": person_dict,
+    "fam": family_dict,
+    "sour": source_dict,
+    "note": note_dict,
+}
+
+
+class JsonLines:
+    """Write the records of a tree as JSON lines (NDJSON), one object per
+    person, family, source and note
+    Like a Spool, it can be given to a Tree to get the records as soon as
+    they are complete; each line is then flushed so it can be read while
+    the crawl goes on.
+    :param file: a text file object
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.lock = threading.Lock()
+
+    def dumps(self, kind, record):
+        """return the JSON line of a record"""
+        return (
+            json.dumps(DICTS[kind](record), ensure_ascii=False, separators=(",", ":"))
+            + "\n"
+        )
+
+    def write(self, kind, record):
+        """write a complete record
+        :param kind: "indi", "fam", "sour" or "note"
+        :param record: an Indi, Fam, Source or Note object
+        """
+        line = self.dumps(kind, record)
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def write_tree(self, tree):
+        """write all the records of a tree
+        :param tree: a Tree object
+        """
+        for fid in tree.indi:
+            self.file.write(self.dumps("indi", tree.indi[fid]))
+        for key in tree.fam:
+            self.file.write(self.dumps("fam", tree.fam[key]))
+        for fid in tree.sources:
+            self.file.write(self.dumps("sour", tree.sources[fid]))
+        for note in tree.notes:
+            self.file.write(self.dumps("note", note))
+        self.file.flush()
+
+
+# tables of the SQLite export: column name, declared type
+SQLITE_TABLES = {
+    "persons": (
+        ("fid", "TEXT PRIMARY KEY"),
+        ("num", "INTEGER"),
+        ("gender", "TEXT"),
+        ("living", "INTEGER"),
+        ("given", "TEXT"),
+        ("surname", "TEXT"),
+        ("birth_date", "TEXT"),
+        ("birth_year", "INTEGER"),
+        ("birth_place", "TEXT"),
+        ("death_date", "TEXT"),
+        ("death_year", "INTEGER"),
+        ("death_place", "TEXT"),
+    ),
+    "names": (
+        ("person", "TEXT"),
+        ("type", "TEXT"),
+        ("given", "TEXT"),
+        ("surname", "TEXT"),
+        ("prefix", "TEXT"),
+        ("suffix", "TEXT"),
+    ),
+    "families": (
+        ("num", "INTEGER PRIMARY KEY"),
+        ("fid", "TEXT"),
+        ("husband", "TEXT"),
+        ("wife", "TEXT"),
+    ),
+    "children": (("family", "INTEGER"), ("child", "TEXT")),
+    "facts": (
+        ("person", "TEXT"),
+        ("family", "INTEGER"),
+        ("type", "TEXT"),
+        ("value", "TEXT"),
+        ("date", "TEXT"),
+        ("year", "INTEGER"),
+        ("place", "TEXT"),
+        ("note", "INTEGER"),
+    ),
+    "places": (
+        ("place", "TEXT PRIMARY KEY"),
+        ("latitude", "REAL"),
+        ("longitude", "REAL"),
+    ),
+    "sources": (
+        ("fid", "TEXT PRIMARY KEY"),
+        ("num", "INTEGER"),
+        ("title", "TEXT"),
+        ("citation", "TEXT"),
+        ("url", "TEXT"),
+    ),
+    "citations": (
+        ("person", "TEXT"),
+        ("family", "INTEGER"),
+        ("source", "TEXT"),
+        ("page", "TEXT"),
+    ),
+    "notes": (("num", "INTEGER PRIMARY KEY"), ("text", "TEXT")),
+}
+# indexes of the SQLite export, created once the rows are inserted
+SQLITE_INDEXES = (
+    "CREATE INDEX persons_surname ON persons (surname)",
+    "CREATE INDEX persons_birth ON persons (birth_year, birth_place)",
+    "CREATE INDEX persons_death ON persons (death_year, death_place)",
+    "CREATE INDEX names_person ON names (person)",
+    "CREATE INDEX names_surname ON names (surname)",
+    "CREATE INDEX families_husband ON families (husband)",
+    "CREATE INDEX families_wife ON families (wife)",
+    "CREATE INDEX families_fid ON families (fid)",
+    "CREATE INDEX children_family ON children (family)",
+    "CREATE INDEX children_child ON children (child)",
+    "CREATE INDEX facts_person ON facts (person)",
+    "CREATE INDEX facts_family ON facts (family)",
+    "CREATE INDEX facts_type_year ON facts (type, year)",
+    "CREATE INDEX facts_place ON facts (place)",
+    "CREATE INDEX citations_person ON citations (person)",
+    "CREATE INDEX citations_source ON citations (source)",
+)
+
+
+def person_rows(tree):
+    """iterate over the rows of the persons table"""
+    for fid in tree.indi:
+        indi = tree.indi[fid]
+        birth = life_event(indi, BIRTH)
+        death = life_event(indi, DEATH)
+        yield (
+            fid,
+            indi.num,
+            indi.gender,
+            indi.living,
+            indi.name.given if indi.name else None,
+            indi.name.surname if indi.name else None,
+            birth.date if birth else None,
+            date_year(birth.date) if birth else None,
+            birth.place if birth else None,
+            death.date if death else None,
+            date_year(death.date) if death else None,
+            death.place if death else None,
+        )
+
+
+def name_rows(tree):
+    """iterate over the rows of the names table"""
+    for fid in tree.indi:
+        indi = tree.indi[fid]
+        if indi.name:
+            yield (fid, "preferred") + tuple(name_dict(indi.name).values())
+        for kind, attribute in NAME_KINDS:
+            for name in getattr(indi, attribute):
+                yield (fid, kind) + tuple(name_dict(name).values())
+
+
+def fact_rows(records, family):
+    """iterate over the facts of records as rows of the facts table
+    :param records: (key, Indi or Fam object) couples
+    :param family: True for families, whose facts are keyed by num
+    """
+    for key, record in records:
+        owner = (None, record.num) if family else (key, None)
+        for fact in record.facts:
+            yield owner + (
+                fact.type,
+                fact.value,
+                fact.date,
+                date_year(fact.date),
+                fact.place,
+                fact.note.num if fact.note else None,
+            )
+
+
+def place_rows(tree):
+    """iterate over the places with coordinates, once each"""
+    places = dict()
+    for records in (tree.indi, tree.fam):
+        for key in records:
+            for fact in records[key].facts:
+                if fact.place and fact.place not in places:
+                    location = coordinates(fact.map)
+                    if location:
+                        places[fact.place] = location
+    for place, (latitude, longitude) in places.items():
+        yield place, latitude, longitude
+
+
+def citation_rows(records, family):
+    """iterate over the sources of records as rows of the citations table"""
+    for key, record in records:
+        owner = (None, record.num) if family else (key, None)
+        for source, quote in record.sources:
+            yield owner + (source.fid, quote)
+
+
+def write_sqlite(tree, filename):
+    """write the tree to a SQLite database, replacing the tables it has
+    The rows are inserted in a single transaction, then indexed.
+    :param tree: a Tree object
+    :param filename: the database file name
+    """
+
+    def indis():
+        return ((fid, tree.indi[fid]) for fid in tree.indi)
+
+    def fams():
+        return ((key, tree.fam[key]) for key in tree.fam)
+
+    inserts = (
+        ("persons", person_rows(tree)),
+        ("names", name_rows(tree)),
+        (
+            "families",
+            ((fam.num, fam.fid, fam.husb_fid, fam.wife_fid) for key, fam in fams()),
+        ),
+        (
+            "children",
+            ((fam.num, child) for key, fam in fams() for child in fam.chil_fid),
+        ),
+        ("facts", fact_rows(indis(), False)),
+        ("facts", fact_rows(fams(), True)),
+        ("places", place_rows(tree)),
+        (
+            "sources",
+            (
+                (fid, source.num, source.title, source.citation, source.url)
+                for fid, source in ((fid, tree.sources[fid]) for fid in tree.sources)
+            ),
+        ),
+        ("citations", citation_rows(indis(), False)),
+        ("citations", citation_rows(fams(), True)),
+        ("notes", ((note.num, note.text) for note in tree.notes)),
+    )
+    connection = sqlite3.connect(filename)
+    try:
+        connection.execute("PRAGMA journal_mode=OFF")
+        connection.execute("PRAGMA synchronous=OFF")
+        with connection:
+            for table, columns in SQLITE_TABLES.items():
+                connection.execute("DROP TABLE IF EXISTS %s" % table)
+                connection.execute(
+                    "CREATE TABLE %s (%s)"
+                    % (table, ", ".join("%s %s" % column for column in columns))
+                )
+            for table, rows in inserts:
+                names = [name for name, declaration in SQLITE_TABLES[table]]
+                connection.executemany(
+                    "INSERT INTO %s (%s) VALUES (%s)"
+                    % (table, ", ".join(names), ", ".join("?" * len(names))),
+                    rows,
+                )
+            for statement in SQLITE_INDEXES:
+                connection.execute(statement)
+    finally:
+        connection.close()
+
+
+# rows of an Arrow or Parquet table built at once
+ARROW_BATCH = 100000
+# columns of the Arrow and Parquet tables: name, type, dictionary encoded
+ARROW_COLUMNS = {
+    "persons": (
+        ("fid", "string", False),
+        ("num", "int32", False),
+        ("gender", "string", True),
+        ("living", "bool_", False),
+        ("given", "string", True),
+        ("surname", "string", True),
+        ("birth_year", "int32", False),
+        ("birth_place", "string", True),
+        ("death_year", "int32", False),
+        ("death_place", "string", True),
+    ),
+    "facts": (
+        ("person", "string", False),
+        ("family", "int32", False),
+        ("type", "string", True),
+        ("value", "string", False),
+        ("date", "string", False),
+        ("year", "int32", False),
+        ("place", "string", True),
+        ("latitude", "float64", False),
+        ("longitude", "float64", False),
+    ),
+    "edges": (
+        ("parent", "string", False),
+        ("child", "string", False),
+        ("role", "string", True),
+    ),
+}
+
+
+def arrow_rows(tree):
+    """iterate over the (table, row) of the Arrow and Parquet export"""
+    for fid in tree.indi:
+        indi = tree.indi[fid]
+        birth = life_event(indi, BIRTH)
+        death = life_event(indi, DEATH)
+        yield "persons", (
+            fid,
+            indi.num,
+            indi.gender,
+            indi.living,
+            indi.name.given if indi.name else None,
+            indi.name.surname if indi.name else None,
+            date_year(birth.date) if birth else None,
+            birth.place if birth else None,
+            date_year(death.date) if death else None,
+            death.place if death else None,
+        )
+        for fact in indi.facts:
+            yield "facts", (fid, None) + arrow_fact(fact)
+        for father, mother in indi.famc_fid:
+            if father:
+                yield "edges", (father, fid, "father")
+            if mother:
+                yield "edges", (mother, fid, "mother")
+    for key in tree.fam:
+        fam = tree.fam[key]
+        for fact in fam.facts:
+            yield "facts", (None, fam.num) + arrow_fact(fact)
+
+
+def arrow_fact(fact):
+    """return the columns of a fact, after its owner"""
+    latitude, longitude = coordinates(fact.map) or (None, None)
+    return (
+        fact.type,
+        fact.value,
+        fact.date,
+        date_year(fact.date),
+        fact.place,
+        latitude,
+        longitude,
+    )
+
+
+def has_pyarrow():
+    """return True if the pyarrow package needed by write_arrow is installed"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def write_outputs(outputs):
+    """write optional outputs, an error in one of them being reported
+    without preventing the others from being written
+    :param outputs: (name, function) couples, function writing the output
+    :return: the number of outputs not written
+    """
+    failed = 0
+    for name, function in outputs:
+        try:
+            function()
+        except Exception as e:
+            sys.stderr.write("Could not write the %s output: %s\n" % (name, e))
+            failed += 1
+    return failed
+
+
+def write_arrow(tree, directory, format="parquet"):
+    """write the persons, facts and parent-child edges of the tree as
+    Arrow or Parquet files, with dictionary encoded strings
+    The tables are written by batches of ARROW_BATCH rows, to persons,
+    facts and edges files in directory. Needs the pyarrow package.
+    :param tree: a Tree object
+    :param directory: the directory of the files, created if needed
+    :param format: "parquet", or "arrow" for Arrow IPC streams
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise OSError("the pyarrow package is required for Arrow and Parquet export")
+    os.makedirs(directory, exist_ok=True)
+    schemas = {
+        table: pyarrow.schema(
+            [
+                (
+                    name,
+                    (
+                        pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+                        if dictionary
+                        else getattr(pyarrow, typ)()
+                    ),
+                )
+                for name, typ, dictionary in columns
+            ]
+        )
+        for table, columns in ARROW_COLUMNS.items()
+    }
+    writers = dict()
+    for table, schema in schemas.items():
+        filename = os.path.join(directory, "%s.%s" % (table, format))
+        if format == "parquet":
+            writers[table] = pyarrow.parquet.ParquetWriter(
+                filename, schema, compression="zstd"
+            )
+        else:
+            # the stream format allows a new dictionary in each batch
+            writers[table] = pyarrow.ipc.new_stream(filename, schema)
+    batches = {table: [] for table in schemas}
+
+    def flush(table):
+        schema = schemas[table]
+        columns = zip(*batches[table])
+        writers[table].write_batch(
+            pyarrow.RecordBatch.from_arrays(
+                [
+                    pyarrow.array(column, type=field.type)
+                    for column, field in zip(columns, schema)
+                ],
+                schema=schema,
+            )
+        )
+        batches[table] = []
+
+    try:
+        for table, row in arrow_rows(tree):
+            batches[table].append(row)
+            if len(batches[table]) >= ARROW_BATCH:
+                flush(table)
+        for table in schemas:
+            if batches[table]:
+                flush(table)
+    finally:
+        for writer in writers.values():
+            writer.close()
@@ -10,13 +10,16 @@ from getmyancestors.classes.tree import (
     Source,
 )
 from getmyancestors.classes.constants import FACT_TYPES, ORDINANCES
+from getmyancestors.classes.compression import decompress
 
 
 class Gedcom:
-    """Parse a GEDCOM file into a Tree"""
+    """Parse a GEDCOM file into a Tree
+    A compressed file is decompressed while it is read.
+    """
 
     def __init__(self, file, tree):
-        self.f = file
+        self.f = decompress(file)
         self.num = None
         self.tree = tree
         self.level = 0
@@ -30,6 +33,10 @@ class Gedcom:
         self.sour = dict()
         self.__parse()
         self.__add_id()
+        # notes are added once complete: a tree with storage writes them
+        # when they leave its cache
+        for note in self.note.values():
+            tree.notes.append(note)
 
     def __parse(self):
         """Parse the GEDCOM file into self.tree"""
@@ -46,7 +53,7 @@ class Gedcom:
             elif self.tag == "NOTE":
                 self.num = int(self.pointer[2 : len(self.pointer) - 1])
                 if self.num not in self.note:
-                    self.note[self.num] = Note(tree=self.tree, num=self.num)
+                    self.note[self.num] = Note(num=self.num)
                 self.__get_note()
             elif self.tag == "SOUR" and self.pointer:
                 self.num = int(self.pointer[2 : len(self.pointer) - 1])
@@ -108,7 +115,7 @@ class Gedcom:
             # Verifica se a tag é um tipo de fato conhecido ou um evento genérico
             elif self.tag in FACT_TYPES or self.tag == "EVEN":
                 # Analisa o fato e o adiciona ao conjunto de fatos do indivíduo
-                self.indi[self.num].facts.add(self.__get_fact())
+                self.indi[self.num].mutable("facts").add(self.__get_fact())
 
             # --- ORDENAÇAS LDS ---
             elif self.tag == "BAPL":
@@ -131,11 +138,15 @@ class Gedcom:
             elif self.tag == "FAMS":
                 # Adiciona o número da família onde este indivíduo é cônjuge
                 # ao conjunto de números de família do cônjuge (fams_num)
-                self.indi[self.num].fams_num.add(int(self.data[2 : len(self.data) - 1]))
+                self.indi[self.num].mutable("fams_num").add(
+                    int(self.data[2 : len(self.data) - 1])
+                )
             elif self.tag == "FAMC":
                 # Adiciona o número da família onde este indivíduo é filho
                 # ao conjunto de números de família filial (famc_num)
-                self.indi[self.num].famc_num.add(int(self.data[2 : len(self.data) - 1]))
+                self.indi[self.num].mutable("famc_num").add(
+                    int(self.data[2 : len(self.data) - 1])
+                )
 
             # --- IDENTIFICADOR DO FAMILYSEARCH ---
             elif self.tag == "_FSFTID":
@@ -148,19 +159,19 @@ class Gedcom:
                 num = int(self.data[2 : len(self.data) - 1])
                 # Se a nota ainda não foi criada no dicionário temporário, cria
                 if num not in self.note:
-                    self.note[num] = Note(tree=self.tree, num=num)
+                    self.note[num] = Note(num=num)
                 # Adiciona a nota ao conjunto de notas do indivíduo
-                self.indi[self.num].notes.add(self.note[num])
+                self.indi[self.num].mutable("notes").add(self.note[num])
 
             # --- FONTES ---
             elif self.tag == "SOUR":
                 # Analisa o link para a fonte e adiciona ao indivíduo
-                self.indi[self.num].sources.add(self.__get_link_source())
+                self.indi[self.num].mutable("sources").add(self.__get_link_source())
 
             # --- OBJETOS (Memórias) ---
             elif self.tag == "OBJE":
                 # Analisa o objeto (memória) e adiciona ao indivíduo
-                self.indi[self.num].memories.add(self.__get_memorie())
+                self.indi[self.num].mutable("memories").add(self.__get_memorie())
 
         # Define a flag para indicar que o parsing deste INDI terminou
         # e a próxima chamada a __get_line deve reutilizar a última linha lida
@@ -174,9 +185,11 @@ class Gedcom:
             elif self.tag == "WIFE":
                 self.fam[self.num].wife_num = int(self.data[2 : len(self.data) - 1])
             elif self.tag == "CHIL":
-                self.fam[self.num].chil_num.add(int(self.data[2 : len(self.data) - 1]))
+                self.fam[self.num].mutable("chil_num").add(
+                    int(self.data[2 : len(self.data) - 1])
+                )
             elif self.tag in FACT_TYPES:
-                self.fam[self.num].facts.add(self.__get_fact())
+                self.fam[self.num].mutable("facts").add(self.__get_fact())
             elif self.tag == "SLGS":
                 self.fam[self.num].sealing_spouse = self.__get_ordinance()
             elif self.tag == "_FSFTID":
@@ -184,10 +197,10 @@ class Gedcom:
             elif self.tag == "NOTE":
                 num = int(self.data[2 : len(self.data) - 1])
                 if num not in self.note:
-                    self.note[num] = Note(tree=self.tree, num=num)
-                self.fam[self.num].notes.add(self.note[num])
+                    self.note[num] = Note(num=num)
+                self.fam[self.num].mutable("notes").add(self.note[num])
             elif self.tag == "SOUR":
-                self.fam[self.num].sources.add(self.__get_link_source())
+                self.fam[self.num].mutable("sources").add(self.__get_link_source())
         self.flag = True
 
     def __get_name(self):
@@ -195,34 +208,34 @@ class Gedcom:
         parts = self.__get_text().split("/")
         name = Name()
         added = False
-        name.given = parts[0].strip()
-        name.surname = parts[1].strip()
+        name.given = self.tree.intern(parts[0].strip())
+        name.surname = self.tree.intern(parts[1].strip())
         if parts[2]:
-            name.suffix = parts[2]
+            name.suffix = self.tree.intern(parts[2])
         if not self.indi[self.num].name:
             self.indi[self.num].name = name
             added = True
         while self.__get_line() and self.level > 1:
             if self.tag == "NPFX":
-                name.prefix = self.data
+                name.prefix = self.tree.intern(self.data)
             elif self.tag == "TYPE":
                 if self.data == "aka":
-                    self.indi[self.num].aka.add(name)
+                    self.indi[self.num].mutable("aka").add(name)
                     added = True
                 elif self.data == "married":
-                    self.indi[self.num].married.add(name)
+                    self.indi[self.num].mutable("married").add(name)
                     added = True
             elif self.tag == "NICK":
                 nick = Name()
-                nick.given = self.data
-                self.indi[self.num].nicknames.add(nick)
+                nick.given = self.tree.intern(self.data)
+                self.indi[self.num].mutable("nicknames").add(nick)
             elif self.tag == "NOTE":
                 num = int(self.data[2 : len(self.data) - 1])
                 if num not in self.note:
-                    self.note[num] = Note(tree=self.tree, num=num)
+                    self.note[num] = Note(num=num)
                 name.note = self.note[num]
         if not added:
-            self.indi[self.num].birthnames.add(name)
+            self.indi[self.num].mutable("birthnames").add(name)
         self.flag = True
 
     def __get_fact(self):
@@ -233,11 +246,11 @@ class Gedcom:
             fact.value = self.data
         while self.__get_line() and self.level > 1:
             if self.tag == "TYPE":
-                fact.type = self.data
+                fact.type = self.tree.intern(self.data)
             if self.tag == "DATE":
-                fact.date = self.__get_text()
+                fact.date = self.tree.intern(self.__get_text())
             elif self.tag == "PLAC":
-                fact.place = self.__get_text()
+                fact.place = self.tree.intern(self.__get_text())
             elif self.tag == "MAP":
                 fact.map = self.__get_map()
             elif self.tag == "NOTE":
@@ -246,12 +259,13 @@ class Gedcom:
                     continue
                 num = int(self.data[2 : len(self.data) - 1])
                 if num not in self.note:
-                    self.note[num] = Note(tree=self.tree, num=num)
+                    self.note[num] = Note(num=num)
                 fact.note = self.note[num]
             elif self.tag == "CONT":
                 fact.value += "\n" + self.data
             elif self.tag == "CONC":
                 fact.value += self.data
+        fact.value = self.tree.intern(fact.value)
         self.flag = True
         return fact
 
@@ -265,7 +279,9 @@ class Gedcom:
             elif self.tag == "LONG":
                 longitude = self.data
         self.flag = True
-        return (latitude, longitude)
+        return self.tree.intern(
+            (self.tree.intern(latitude), self.tree.intern(longitude))
+        )
 
     def __get_text(self):
         """Parse a multiline text"""
@@ -298,8 +314,8 @@ class Gedcom:
             elif self.tag == "NOTE":
                 num = int(self.data[2 : len(self.data) - 1])
                 if num not in self.note:
-                    self.note[num] = Note(tree=self.tree, num=num)
-                self.sour[self.num].notes.add(self.note[num])
+                    self.note[num] = Note(num=num)
+                self.sour[self.num].mutable("notes").add(self.note[num])
         self.flag = True
 
     def __get_link_source(self):
@@ -337,7 +353,7 @@ class Gedcom:
             if self.tag == "DATE":
                 ordinance.date = self.__get_text()
             elif self.tag == "TEMP":
-                ordinance.temple_code = self.data
+                ordinance.temple_code = self.tree.intern(self.data)
             elif self.tag == "STAT":
                 ordinance.status = ORDINANCES[self.data]
             elif self.tag == "FAMC":
@@ -356,13 +372,13 @@ class Gedcom:
             if self.fam[num].wife_num:
                 self.fam[num].wife_fid = self.indi[self.fam[num].wife_num].fid
             for chil in self.fam[num].chil_num:
-                self.fam[num].chil_fid.add(self.indi[chil].fid)
+                self.fam[num].mutable("chil_fid").add(self.indi[chil].fid)
         for num in self.indi:
             for famc in self.indi[num].famc_num:
-                self.indi[num].famc_fid.add(
+                self.indi[num].mutable("famc_fid").add(
                     (self.fam[famc].husb_fid, self.fam[famc].wife_fid)
                 )
             for fams in self.indi[num].fams_num:
-                self.indi[num].fams_fid.add(
+                self.indi[num].mutable("fams_fid").add(
                     (self.fam[fams].husb_fid, self.fam[fams].wife_fid)
                 )
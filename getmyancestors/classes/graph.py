@@ -0,0 +1,186 @@
+# global imports
+from array import array
+
+# roles of an individual in a parents and child relationship
+CHILD, FATHER, MOTHER = 1, 2, 4
+# roles of an individual in a couple relationship
+PERSON1, PERSON2 = 1, 2
+# bits of an individual integer in a packed key
+NODE_BITS = 32
+
+
+def pack(*nodes):
+    """return the nodes (integers, -1 for None) packed into one integer, a
+    dict key much smaller than their tuple
+    """
+    key = 0
+    for node in nodes:
+        key = key << NODE_BITS | node + 1
+    return key
+
+
+class Adjacency:
+    """Integers attached to each node, as linked lists in flat arrays
+    head[node] is the slot of the last value added to node, and next[slot]
+    the slot of the value added before it, or -1.
+    """
+
+    def __init__(self):
+        self.head = array("l")
+        self.next = array("l")
+        self.value = array("l")
+
+    def add(self, node, value):
+        """attach value to node"""
+        if node >= len(self.head):
+            self.head.extend([-1] * (node + 1 - len(self.head)))
+        self.next.append(self.head[node])
+        self.value.append(value)
+        self.head[node] = len(self.value) - 1
+
+    def get(self, node):
+        """iterate over the values attached to node"""
+        slot = self.head[node] if node < len(self.head) else -1
+        while slot >= 0:
+            yield self.value[slot]
+            slot = self.next[slot]
+
+
+class Graph:
+    """Relationships between the individuals of a Tree
+    Each fid is mapped to a dense integer, and the relationships are stored
+    once in arrays of integers: a parents and child relationship is a trio
+    (father, mother, child) and a couple relationship a pair of persons with
+    the fid of the relationship. Like the FamilySearch responses they come
+    from, a relationship is only attached to the individuals that were in
+    the tree when it was received. The relationships are found by their
+    nodes packed into one integer (see pack).
+    """
+
+    def __init__(self):
+        self.ids = dict()
+        self.fids = list()
+        self.trios = dict()
+        self.trio_father = array("l")
+        self.trio_mother = array("l")
+        self.trio_child = array("l")
+        self.trio_roles = bytearray()
+        self.couples = dict()
+        self.couple_person1 = array("l")
+        self.couple_person2 = array("l")
+        self.couple_fid = list()
+        self.couple_roles = bytearray()
+        self.parent_trios = Adjacency()
+        self.child_trios = Adjacency()
+        self.spouse_couples = Adjacency()
+
+    def __len__(self):
+        return len(self.fids)
+
+    def id(self, fid):
+        """return the integer of fid, -1 for None"""
+        if not fid:
+            return -1
+        node = self.ids.get(fid)
+        if node is None:
+            node = self.ids[fid] = len(self.fids)
+            self.fids.append(fid)
+        return node
+
+    def fid(self, node):
+        """return the fid of an integer, None for -1"""
+        return self.fids[node] if node >= 0 else None
+
+    def add_trio(self, father, mother, child, known):
+        """add a parents and child relationship
+        :param father: the father fid or None
+        :param mother: the mother fid or None
+        :param child: the child fid or None
+        :param known: function telling if a fid is in the tree
+        """
+        nodes = (self.id(father), self.id(mother), self.id(child))
+        key = pack(*nodes)
+        trio = self.trios.get(key)
+        if trio is None:
+            trio = self.trios[key] = len(self.trio_roles)
+            self.trio_father.append(nodes[0])
+            self.trio_mother.append(nodes[1])
+            self.trio_child.append(nodes[2])
+            self.trio_roles.append(0)
+        for role, fid, node, adjacency in (
+            (CHILD, child, nodes[2], self.parent_trios),
+            (FATHER, father, nodes[0], self.child_trios),
+            (MOTHER, mother, nodes[1], self.child_trios),
+        ):
+            if fid and not self.trio_roles[trio] & role and known(fid):
+                self.trio_roles[trio] |= role
+                adjacency.add(node, trio)
+
+    def add_couple(self, person1, person2, relfid, known):
+        """add a couple relationship
+        :param person1: the fid of the first person
+        :param person2: the fid of the second person
+        :param relfid: the fid of the relationship
+        :param known: function telling if a fid is in the tree
+        """
+        nodes = (self.id(person1), self.id(person2))
+        key = pack(*nodes)
+        couple = self.couples.get(key)
+        if couple is not None and self.couple_fid[couple] != relfid:
+            # another relationship of the same persons, keyed with its fid
+            key = (key, relfid)
+            couple = self.couples.get(key)
+        if couple is None:
+            couple = self.couples[key] = len(self.couple_roles)
+            self.couple_person1.append(nodes[0])
+            self.couple_person2.append(nodes[1])
+            self.couple_fid.append(relfid)
+            self.couple_roles.append(0)
+        for role, fid, node in (
+            (PERSON1, person1, nodes[0]),
+            (PERSON2, person2, nodes[1]),
+        ):
+            if not self.couple_roles[couple] & role and known(fid):
+                self.couple_roles[couple] |= role
+                self.spouse_couples.add(node, couple)
+
+    def _collect(self, fids, adjacency):
+        """return the sorted relationship numbers attached to fids"""
+        found = set()
+        for fid in fids:
+            node = self.ids.get(fid)
+            if node is not None:
+                found.update(adjacency.get(node))
+        return sorted(found)
+
+    def _trio(self, trio):
+        return (
+            self.fid(self.trio_father[trio]),
+            self.fid(self.trio_mother[trio]),
+            self.fid(self.trio_child[trio]),
+        )
+
+    def parents(self, fids):
+        """return the (father, mother, child) relationships of children
+        :param fids: an iterable of child fids
+        """
+        return [self._trio(t) for t in self._collect(fids, self.parent_trios)]
+
+    def children(self, fids):
+        """return the (father, mother, child) relationships of parents
+        :param fids: an iterable of parent fids
+        """
+        return [self._trio(t) for t in self._collect(fids, self.child_trios)]
+
+    def spouses(self, fids):
+        """return the (person1, person2, relfid) relationships of persons
+        :param fids: an iterable of fids
+        """
+        return [
+            (
+                self.fid(self.couple_person1[c]),
+                self.fid(self.couple_person2[c]),
+                self.couple_fid[c],
+            )
+            for c in self._collect(fids, self.spouse_couples)
+        ]
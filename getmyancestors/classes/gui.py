@@ -19,8 +19,10 @@ from tkinter.ttk import Frame, Label, Entry, Button, Checkbutton, Treeview, Note
 
 from getmyancestors.classes.tree import Indi, Fam, Tree
 from getmyancestors.classes.gedcom import Gedcom
+from getmyancestors.classes.compression import compress, compression_of
 from getmyancestors.classes.session import Session
 from getmyancestors.classes.translation import translations
+from getmyancestors.classes import diagnostics
 
 tmp_dir = os.path.join(tempfile.gettempdir(), "fstogedcom")
 cache = Cache(tmp_dir)
@@ -218,19 +220,13 @@ class Merge(Frame):
                 tree.fam[(husb, wife)].sealing_spouse = ged.fam[num].sealing_spouse
 
         # merge notes by text
-        tree.notes = sorted(tree.notes, key=lambda x: x.text)
-        for i, n in enumerate(tree.notes):
-            if i == 0:
-                n.num = 1
-                continue
-            if n.text == tree.notes[i - 1].text:
-                n.num = tree.notes[i - 1].num
-            else:
-                n.num = tree.notes[i - 1].num + 1
+        tree.merge_notes()
 
         # compute number for family relationships and print GEDCOM file
         tree.reset_num()
-        with open(filename, "w", encoding="utf-8") as file:
+        with compress(
+            open(filename, "w", encoding="utf-8"), compression_of(filename)
+        ) as file:
             tree.print(file)
         messagebox.showinfo(_("Info"), message=_("Files successfully merged"))
 
@@ -258,7 +254,13 @@ class SignIn(Frame):
 
         self.save_password = IntVar()
         self.save_password.set(cache.get("save_password") or 0)
-        check_save_password = Checkbutton(self, text=_("Save Password"), variable=self.save_password, onvalue=1, offvalue=0)
+        check_save_password = Checkbutton(
+            self,
+            text=_("Save Password"),
+            variable=self.save_password,
+            onvalue=1,
+            offvalue=0,
+        )
 
         label_username.grid(row=0, column=0, pady=15, padx=(0, 5))
         entry_username.grid(row=0, column=1)
@@ -463,7 +465,9 @@ class Download(Frame):
         )
         if not filename:
             return
-        with open(filename, "w", encoding="utf-8") as file:
+        with compress(
+            open(filename, "w", encoding="utf-8"), compression_of(filename)
+        ) as file:
             self.tree.print(file)
 
     def login(self):
@@ -529,6 +533,8 @@ class Download(Frame):
     def quit(self):
         """prevent exception during download"""
         self.update_needed = False
+        if self.fs and self.fs.logger:
+            self.fs.logger.stop()
         if self.logfile:
             self.logfile.close()
         super().quit()
@@ -582,17 +588,23 @@ class Download(Frame):
         async def download_stuff(loop):
             futures = set()
             for fid, indi in self.tree.indi.items():
-                futures.add(loop.run_in_executor(None, indi.get_notes))
+                futures.add(loop.run_in_executor(self.fs.executor, indi.get_notes))
                 if ordi:
                     futures.add(
-                        loop.run_in_executor(None, self.tree.add_ordinances, fid)
+                        loop.run_in_executor(
+                            self.fs.executor, self.tree.add_ordinances, fid
+                        )
                     )
                 if cont:
-                    futures.add(loop.run_in_executor(None, indi.get_contributors))
+                    futures.add(
+                        loop.run_in_executor(self.fs.executor, indi.get_contributors)
+                    )
             for fam in self.tree.fam.values():
-                futures.add(loop.run_in_executor(None, fam.get_notes))
+                futures.add(loop.run_in_executor(self.fs.executor, fam.get_notes))
                 if cont:
-                    futures.add(loop.run_in_executor(None, fam.get_contributors))
+                    futures.add(
+                        loop.run_in_executor(self.fs.executor, fam.get_contributors)
+                    )
             for future in futures:
                 await future
 
@@ -652,12 +664,37 @@ class FStoGEDCOM(Notebook):
         self.merge = Merge(self)
         self.add(self.download, text=_("Download GEDCOM"))
         self.add(self.merge, text=_("Merge GEDCOMs"))
+        self.menu = Menu(master)
+        self.tools = Menu(self.menu, tearoff=0)
+        self.tools.add_command(
+            label=_("Dump diagnostics"), command=self.dump_diagnostics
+        )
+        self.menu.add_cascade(label=_("Tools"), menu=self.tools)
+        master.config(menu=self.menu)
         self.pack()
 
+    def dump_diagnostics(self):
+        """append the state of the running download to a file chosen by the user"""
+        filename = filedialog.asksaveasfilename(
+            title=_("Save as"),
+            initialfile="diagnostics.log",
+            defaultextension=".log",
+            filetypes=(("Log", ".log"), (_("All files"), "*.*")),
+        )
+        if not filename:
+            return
+        with open(filename, "a", encoding="utf-8") as file:
+            diagnostics.dump(self.download.fs, self.download.tree, file)
+        messagebox.showinfo(
+            _("Info"), message=_("Diagnostics written to %s") % filename
+        )
+
     def change_lang(self):
         """update text with user's language"""
         self.tab(self.index(self.download), text=_("Download GEDCOM"))
         self.tab(self.index(self.merge), text=_("Merge GEDCOMs"))
+        self.menu.entryconfig("last", label=_("Tools"))
+        self.tools.entryconfig(0, label=_("Dump diagnostics"))
         self.download.btn_quit.config(text=_("Quit"))
         self.merge.btn_quit.config(text=_("Quit"))
         self.merge.btn_save.config(text=_("Merge"))
@@ -0,0 +1,69 @@
+# global imports
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+
+# structured fields of the log records
+FIELDS = ("phase", "url", "status", "duration")
+
+
+class TextFormatter(logging.Formatter):
+    """Format log records as "[date time]: message" lines"""
+
+    def __init__(self):
+        super().__init__("[%(asctime)s]: %(message)s", "%Y-%m-%d %H:%M:%S")
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as JSON lines with their structured fields"""
+
+    def format(self, record):
+        data = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        return json.dumps(data)
+
+
+class QueueLogger:
+    """Logger writing records from a background thread
+    Callers only build a record and put it in a queue, the formatting
+    and the writes to the streams happen in a QueueListener thread.
+    :param name: a unique logger name
+    :param streams: the file objects to write to
+    :param fmt: "text" or "json"
+    """
+
+    def __init__(self, name, streams, fmt="text"):
+        self.logger = logging.getLogger(name)
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        formatter = JsonFormatter() if fmt == "json" else TextFormatter()
+        handlers = list()
+        for stream in streams:
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(formatter)
+            handlers.append(handler)
+        log_queue = queue.SimpleQueue()
+        self.logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+        self.listener = logging.handlers.QueueListener(log_queue, *handlers)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def log(self, level, text, **fields):
+        """queue a record with its structured fields"""
+        self.logger.log(level, text, extra=fields)
+
+    def stop(self):
+        """write the queued records and stop the background thread"""
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
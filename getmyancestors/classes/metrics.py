@@ -0,0 +1,182 @@
+# global imports
+import json
+import threading
+from collections import Counter
+
+# upper bounds in seconds of the latency histogram buckets
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def endpoint(url):
+    """return the endpoint family of a FamilySearch URL
+    The sources, notes and changes of persons and of couple relationships
+    are counted together, under the family of the resource returned.
+    :param url: the URL path given to Session.get_url
+    """
+    path = url.split("?")[0].rstrip("/")
+    if "/ordinances" in path or "/reservations/" in path:
+        return "ordinances"
+    for family in ("sources", "notes", "changes"):
+        if path.endswith("/" + family):
+            return family
+    if path.startswith("/platform/memories/"):
+        return "memories"
+    if path.startswith("/platform/tree/couple-relationships"):
+        return "couple-relationships"
+    if path.startswith("/platform/tree/persons"):
+        return "persons"
+    return "other"
+
+
+class EndpointMetrics:
+    """Metrics of an endpoint family"""
+
+    def __init__(self):
+        self.count = 0
+        self.retries = 0
+        self.bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.status = Counter()
+
+    def as_dict(self):
+        """return the metrics as a JSON serializable dict"""
+        return {
+            "count": self.count,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "latency": {
+                "sum": self.latency_sum,
+                "buckets": dict(
+                    zip([str(b) for b in BUCKETS] + ["+Inf"], self.buckets)
+                ),
+            },
+            "status": dict(self.status),
+        }
+
+
+class Metrics:
+    """Thread-safe registry of request metrics per endpoint family"""
+
+    def __init__(self):
+        self.endpoints = dict()
+        self._lock = threading.Lock()
+
+    def _get(self, url):
+        family = endpoint(url)
+        if family not in self.endpoints:
+            self.endpoints[family] = EndpointMetrics()
+        return self.endpoints[family]
+
+    @property
+    def requests(self):
+        """total number of requests"""
+        with self._lock:
+            return sum(m.count for m in self.endpoints.values())
+
+    def request(self, url):
+        """count a new request"""
+        with self._lock:
+            self._get(url).count += 1
+
+    def retry(self, url):
+        """count a new attempt for a request"""
+        with self._lock:
+            self._get(url).retries += 1
+
+    def response(self, url, status, latency=None, size=0, from_cache=False):
+        """record the outcome of an attempt
+        :param status: the HTTP status code or an error name
+        :param latency: duration of the attempt in seconds
+        :param size: size of the response body in bytes
+        :param from_cache: True if the response was read from the cache
+        """
+        with self._lock:
+            metrics = self._get(url)
+            metrics.status[str(status)] += 1
+            metrics.bytes += size
+            if from_cache:
+                metrics.cache_hits += 1
+            elif latency is not None:
+                metrics.cache_misses += 1
+            if latency is not None:
+                metrics.latency_sum += latency
+                index = 0
+                while index < len(BUCKETS) and latency > BUCKETS[index]:
+                    index += 1
+                metrics.buckets[index] += 1
+
+    def totals(self):
+        """return the request, retry and cache counts of all endpoints"""
+        with self._lock:
+            return {
+                key: sum(getattr(m, key) for m in self.endpoints.values())
+                for key in ("count", "retries", "cache_hits", "cache_misses")
+            }
+
+    def as_dict(self):
+        """return the metrics as a JSON serializable dict"""
+        with self._lock:
+            return {
+                family: metrics.as_dict()
+                for family, metrics in sorted(self.endpoints.items())
+            }
+
+    def to_json(self, file):
+        """write the metrics in JSON format"""
+        json.dump(self.as_dict(), file, indent=2)
+        file.write("\n")
+
+    def to_prometheus(self, file):
+        """write the metrics in Prometheus text format"""
+        data = self.as_dict()
+        simple = (
+            ("requests_total", "count", "Requests sent to FamilySearch"),
+            ("retries_total", "retries", "Requests attempted again"),
+            ("response_bytes_total", "bytes", "Size of the response bodies"),
+            ("cache_hits_total", "cache_hits", "Responses read from the cache"),
+            ("cache_misses_total", "cache_misses", "Responses read from the network"),
+        )
+        for name, key, text in simple:
+            file.write("# HELP getmyancestors_%s %s\n" % (name, text))
+            file.write("# TYPE getmyancestors_%s counter\n" % name)
+            for family, metrics in data.items():
+                file.write(
+                    'getmyancestors_%s{endpoint="%s"} %s\n'
+                    % (name, family, metrics[key])
+                )
+        name = "getmyancestors_responses_total"
+        file.write("# HELP %s Responses per status code\n" % name)
+        file.write("# TYPE %s counter\n" % name)
+        for family, metrics in data.items():
+            for status, count in sorted(metrics["status"].items()):
+                file.write(
+                    '%s{endpoint="%s",code="%s"} %s\n' % (name, family, status, count)
+                )
+        name = "getmyancestors_request_duration_seconds"
+        file.write("# HELP %s Latency of the requests\n" % name)
+        file.write("# TYPE %s histogram\n" % name)
+        for family, metrics in data.items():
+            total = 0
+            for le, count in metrics["latency"]["buckets"].items():
+                total += count
+                file.write(
+                    '%s_bucket{endpoint="%s",le="%s"} %s\n' % (name, family, le, total)
+                )
+            file.write(
+                '%s_sum{endpoint="%s"} %s\n' % (name, family, metrics["latency"]["sum"])
+            )
+            file.write('%s_count{endpoint="%s"} %s\n' % (name, family, total))
+
+    def dump(self, file, fmt="json"):
+        """write the metrics
+        :param fmt: "json" or "prometheus"
+        """
+        if fmt == "prometheus":
+            self.to_prometheus(file)
+        else:
+            self.to_json(file)
@@ -0,0 +1,116 @@
+# global imports
+import os
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from functools import partial
+
+
+class Profiler:
+    """Write a CPU profile and an allocation summary for each phase of a run
+    For each phase, <directory>/<NN>-<phase>.prof holds the cProfile data
+    (readable with pstats or snakeviz), <NN>-<phase>.txt the top functions
+    by cumulative time, and <NN>-<phase>.mem.txt the top allocation sites
+    by file and line of the memory still allocated at the end of the phase.
+    :param directory: output directory, nothing is profiled if None
+    :param top: number of lines in the text reports
+    """
+
+    def __init__(self, directory=None, top=30):
+        self.directory = directory
+        self.top = top
+        self.count = 0
+        self.name = None
+        self.start_time = None
+        self.profile = None
+        self.workers = list()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def start(self, name):
+        """start profiling a phase, stopping the current one"""
+        if not self.directory:
+            return
+        self.stop()
+        self.count += 1
+        self.name = name
+        self.workers = list()
+        tracemalloc.start()
+        self.start_time = time.time()
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        """stop profiling the current phase and write its reports"""
+        if not self.profile:
+            return
+        self.profile.disable()
+        elapsed = time.time() - self.start_time
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        prefix = os.path.join(self.directory, "%02d-%s" % (self.count, self.name))
+        with self._lock:
+            stats = pstats.Stats(self.profile)
+            for profile in self.workers:
+                stats.add(profile)
+            self.profile = None
+            self.workers = list()
+        stats.dump_stats(prefix + ".prof")
+        with open(prefix + ".txt", "w", encoding="UTF-8") as file:
+            file.write("Phase %s: %.3f seconds\n\n" % (self.name, elapsed))
+            stats.stream = file
+            stats.sort_stats("cumulative").print_stats(self.top)
+        with open(prefix + ".mem.txt", "w", encoding="UTF-8") as file:
+            file.write(
+                "Phase %s: %.1f MiB allocated at the end, %.1f MiB at peak\n\n"
+                % (self.name, current / 2**20, peak / 2**20)
+            )
+            for stat in snapshot.statistics("lineno")[: self.top]:
+                file.write("%s\n" % stat)
+
+    def call(self, func, *args):
+        """call func in a worker thread, profiling it if a phase is active"""
+        if not self.profile:
+            return func(*args)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # a single profiler is allowed since Python 3.12,
+            # and the one of the phase already covers every thread
+            return func(*args)
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            with self._lock:
+                self.workers.append(profile)
+
+    def executor(self, executor):
+        """return executor profiling the functions it runs"""
+        if not self.directory:
+            return executor
+        return ProfiledExecutor(executor, self)
+
+
+class ProfiledExecutor:
+    """Executor running its functions through Profiler.call
+    :param executor: the wrapped concurrent.futures Executor
+    :param profiler: a Profiler object
+    """
+
+    def __init__(self, executor, profiler):
+        self.wrapped = executor
+        self.profiler = profiler
+
+    def submit(self, func, *args, **kwargs):
+        """schedule func(*args, **kwargs)"""
+        return self.wrapped.submit(self.profiler.call, partial(func, *args, **kwargs))
+
+    def shutdown(self, wait=True, **kwargs):
+        """shutdown the wrapped executor"""
+        self.wrapped.shutdown(wait, **kwargs)
@@ -0,0 +1,172 @@
+# global imports
+import sys
+import json
+import time
+import threading
+
+
+def duration(seconds):
+    """format a number of seconds as H:MM:SS"""
+    seconds = int(seconds)
+    return "%d:%02d:%02d" % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class Progress:
+    """Report the progress of a crawl
+    A status line with the number of individuals and families, the queue
+    depth, the request rate, the cache hit rate, the concurrency limit and
+    the ETA of the current phase is refreshed in place on a terminal, and
+    printed every `quiet_interval` seconds otherwise. With json_events, the
+    phases and the status are written as newline-delimited JSON events.
+    :param fs: a Session object
+    :param tree: a Tree object
+    :param file: the output stream
+    :param json_events: True to write JSON events instead of text
+    :param interval: seconds between two status updates
+    :param quiet_interval: seconds between two status lines if not a terminal
+    """
+
+    def __init__(
+        self,
+        fs,
+        tree,
+        file=sys.stderr,
+        json_events=False,
+        interval=1.0,
+        quiet_interval=30.0,
+    ):
+        self.fs = fs
+        self.tree = tree
+        self.file = file
+        self.json_events = json_events
+        self.interval = interval
+        self.quiet_interval = quiet_interval
+        self.tty = not json_events and hasattr(file, "isatty") and file.isatty()
+        self.name = None
+        self.total = self.done = 0
+        self.start_time = self.phase_time = self.last_time = time.time()
+        self.last_line = 0
+        self.last_requests = 0
+        self.rate = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def phase(self, name, text=None):
+        """start a new phase or step of the crawl
+        :param name: the phase name
+        :param text: a message for humans
+        """
+        with self._lock:
+            self.name = name
+            self.total = self.done = 0
+            self.phase_time = time.time()
+        if self.json_events:
+            self.emit("phase", phase=name, message=text)
+        elif text:
+            self.write(text + "\n")
+
+    def expect(self, count):
+        """add count items to the work of the current phase"""
+        with self._lock:
+            self.total += count
+
+    def advance(self, count=1):
+        """mark count items of the current phase as done"""
+        with self._lock:
+            self.done += count
+
+    def status(self):
+        """return the current status as a dict"""
+        now = time.time()
+        totals = self.fs.metrics.totals()
+        cached = totals["cache_hits"] + totals["cache_misses"]
+        with self._lock:
+            elapsed = now - self.phase_time
+            eta = None
+            if self.total and self.done:
+                eta = elapsed * max(0, self.total - self.done) / self.done
+            if now - self.last_time >= self.interval / 2:
+                self.rate = (totals["count"] - self.last_requests) / (
+                    now - self.last_time
+                )
+                self.last_time = now
+                self.last_requests = totals["count"]
+            return {
+                "phase": self.name,
+                "elapsed": round(now - self.start_time, 3),
+                "individuals": len(self.tree.indi),
+                "families": len(self.tree.fam),
+                "done": self.done,
+                "total": self.total,
+                "queue": self.fs.scheduler.waiting,
+                "in_flight": self.fs.scheduler.in_flight,
+                "concurrency": self.fs.scheduler.limit,
+                "requests": totals["count"],
+                "requests_per_second": round(self.rate, 2),
+                "cache_hit_rate": (
+                    round(totals["cache_hits"] / cached, 3) if cached else None
+                ),
+                "eta": round(eta, 1) if eta is not None else None,
+            }
+
+    def line(self, status):
+        """format a status as a line for humans"""
+        line = "[%s] %s individuals, %s families | %.1f req/s" % (
+            status["phase"],
+            status["individuals"],
+            status["families"],
+            status["requests_per_second"],
+        )
+        if status["cache_hit_rate"] is not None:
+            line += ", cache %d%%" % (status["cache_hit_rate"] * 100)
+        line += " | queue %s, concurrency %s" % (
+            status["queue"],
+            status["concurrency"],
+        )
+        if status["total"]:
+            line += " | %s/%s" % (status["done"], status["total"])
+        if status["eta"] is not None:
+            line += " ETA %s" % duration(status["eta"])
+        return line
+
+    def emit(self, event, **data):
+        """write a JSON event"""
+        data = dict(event=event, time=round(time.time(), 3), **data)
+        self.write(json.dumps(data) + "\n")
+
+    def write(self, text):
+        """write text, clearing the status line on a terminal"""
+        with self._lock:
+            if self.tty:
+                text = "\r\x1b[K" + text
+            self.file.write(text)
+            self.file.flush()
+
+    def update(self):
+        """write the current status"""
+        status = self.status()
+        if self.json_events:
+            self.emit("progress", **status)
+        elif self.tty:
+            with self._lock:
+                self.file.write("\r\x1b[K" + self.line(status))
+                self.file.flush()
+        elif time.time() - self.last_line >= self.quiet_interval:
+            self.last_line = time.time()
+            self.write(self.line(status) + "\n")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.update()
+
+    def close(self):
+        """stop reporting and write the final status"""
+        self._stop.set()
+        self._thread.join()
+        status = self.status()
+        if self.json_events:
+            self.emit("end", **status)
+        elif self.tty:
+            self.write("")
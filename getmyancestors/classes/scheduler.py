@@ -0,0 +1,108 @@
+# global imports
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+class Scheduler:
+    """AIMD limiter for the number of FamilySearch requests in flight
+    The limit grows additively (about one slot per round of `limit`
+    completed requests) while the p95 latency and the error rate of the
+    recent requests stay healthy, and is cut multiplicatively on
+    429/5xx responses and timeouts.
+    :param initial: initial number of requests in flight
+    :param minimum: lower bound of the limit
+    :param maximum: upper bound of the limit
+    :param target_latency: p95 latency in seconds above which the limit stops growing
+    :param max_error_rate: error rate above which the limit stops growing
+    :param backoff: factor applied to the limit on errors
+    :param window: number of recent requests used for p95 and error rate
+    """
+
+    def __init__(
+        self,
+        initial=8,
+        minimum=1,
+        maximum=32,
+        target_latency=5.0,
+        max_error_rate=0.05,
+        backoff=0.5,
+        window=200,
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.backoff = backoff
+        self.in_flight = 0
+        self.waiting = 0
+        self.last_backoff = 0
+        self._limit = float(min(max(initial, self.minimum), self.maximum))
+        self._latencies = deque(maxlen=window)
+        self._errors = deque(maxlen=window)
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self):
+        """current number of requests allowed in flight"""
+        return int(self._limit)
+
+    @contextmanager
+    def slot(self):
+        """wait for a free slot and hold it during a request"""
+        with self._cond:
+            self.waiting += 1
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.waiting -= 1
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify()
+
+    def percentile(self, q, min_samples=1):
+        """return the q-th percentile of the recent latencies
+        or None if there are less than min_samples latencies
+        """
+        with self._cond:
+            latencies = sorted(self._latencies)
+        if not latencies or len(latencies) < min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q / 100))]
+
+    def error_rate(self):
+        """return the proportion of errors among the recent requests"""
+        with self._cond:
+            if not self._errors:
+                return 0.0
+            return sum(self._errors) / len(self._errors)
+
+    def success(self, latency):
+        """record a successful request and grow the limit if healthy
+        :param latency: duration of the request in seconds
+        """
+        with self._cond:
+            self._latencies.append(latency)
+            self._errors.append(False)
+        p95 = self.percentile(95)
+        if p95 <= self.target_latency and self.error_rate() <= self.max_error_rate:
+            with self._cond:
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+                self._cond.notify_all()
+
+    def failure(self):
+        """record a throttled, failed or timed out request and back off
+        the limit is cut at most once per p95 latency, so that a burst of
+        errors from the same round of requests counts as one congestion event
+        """
+        now = time.time()
+        p95 = self.percentile(95) or 1
+        with self._cond:
+            self._errors.append(True)
+            if now - self.last_backoff >= p95:
+                self.last_backoff = now
+                self._limit = max(self.minimum, self._limit * self.backoff)
@@ -1,6 +1,10 @@
 # global imports
 import sys
 import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from urllib.parse import urlparse, parse_qs
 import webbrowser
 
@@ -10,17 +14,35 @@ from requests_cache import CachedSession
 
 # local imports
 from getmyancestors.classes.translation import translations
+from getmyancestors.classes.scheduler import Scheduler
+from getmyancestors.classes.metrics import Metrics
+from getmyancestors.classes.tracing import Tracer
+from getmyancestors.classes.logger import QueueLogger
 
 DEFAULT_CLIENT_ID = "a02j000000KTRjpAAH"
 DEFAULT_REDIRECT_URI = "https://misbach.github.io/fs-auth/index_raw.html"
 
 
+def close_response(future):
+    """close the response of a request that lost a hedge, if it got one"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
 class Session(CachedSession):
     """Create a FamilySearch session
     :param username and password: valid FamilySearch credentials
     :param verbose: True to active verbose mode
     :param logfile: a file object or similar
     :param timeout: time before retry a request
+    :param concurrency: initial number of requests in flight
+    :param max_concurrency: maximum number of requests in flight
+    :param hedge: True to send a duplicate of the requests slower than usual
+    :param hedge_percentile: latency percentile after which a request is duplicated
+    :param hedge_ratio: maximum proportion of duplicated requests
+    :param trace: True to record every HTTP request in self.tracer
+    :param log_format: "text" or "json" lines
+    :param log_sample: proportion of the requests whose routine lines are logged
     """
     def __init__(
         self,
@@ -31,6 +53,14 @@ class Session(CachedSession):
         verbose=False,
         logfile=False,
         timeout=60,
+        concurrency=8,
+        max_concurrency=32,
+        hedge=False,
+        hedge_percentile=95,
+        hedge_ratio=0.05,
+        trace=False,
+        log_format="text",
+        log_sample=1.0,
     ):
         super().__init__(backend='sqlite')
         self.username = username
@@ -40,22 +70,70 @@ class Session(CachedSession):
         self.verbose = verbose
         self.logfile = logfile
         self.timeout = timeout
+        self.log_sample = log_sample
+        self.logger = None
+        streams = ([sys.stderr] if verbose else []) + ([logfile] if logfile else [])
+        if streams:
+            self.logger = QueueLogger(
+                "getmyancestors.session.%s" % id(self), streams, log_format
+            )
         self.fid = self.lang = self.display_name = None
-        self.counter = 0
+        self.metrics = Metrics()
+        self.tracer = Tracer() if trace else None
+        self.phase = "login"
+        self.progress = None
+        self.activity = dict()
+        self.scheduler = Scheduler(concurrency, maximum=max_concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=self.scheduler.maximum)
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_ratio = hedge_ratio
+        self.hedge_executor = None
+        if hedge:
+            # a request and its duplicate for each slot of the scheduler
+            self.hedge_executor = ThreadPoolExecutor(
+                max_workers=2 * self.scheduler.maximum
+            )
+        self.hedge_lock = threading.Lock()
+        self.hedge_requests = self.hedged = 0
         self.headers = {"User-Agent": UserAgent().firefox}
         self.login()
         
+    @property
+    def counter(self):
+        """number of requests sent with get_url"""
+        return self.metrics.requests
+
     @property
     def logged(self):
         return bool(self.cookies.get("fssessionid"))
 
-    def write_log(self, text):
-        """write text in the log file"""
-        log = "[%s]: %s\n" % (time.strftime("%Y-%m-%d %H:%M:%S"), text)
-        if self.verbose:
-            sys.stderr.write(log)
-        if self.logfile:
-            self.logfile.write(log)
+    def request(self, method, url, *args, **kwargs):
+        """send a request, recording it in the tracer if any"""
+        if not self.tracer:
+            return super().request(method, url, *args, **kwargs)
+        start = time.time()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except Exception as e:
+            self.tracer.record(method, url, start, time.time(), self.phase, error=e)
+            raise
+        self.tracer.record(method, url, start, time.time(), self.phase, response)
+        return response
+
+    def write_log(self, text, level=logging.INFO, **fields):
+        """queue text for the log file and stderr in verbose mode
+        :param level: a logging level
+        :param fields: structured fields (url, status, duration)
+        """
+        if self.logger:
+            self.logger.log(level, text, phase=self.phase, **fields)
+
+    def log_sampled(self):
+        """return True if the routine lines of a request should be logged"""
+        return bool(self.logger) and (
+            self.log_sample >= 1 or random.random() < self.log_sample
+        )
 
     def login(self):
         """retrieve FamilySearch session ID
@@ -148,9 +226,27 @@ class Session(CachedSession):
                 self.set_current()
                 break
 
+    def set_activity(self, state=None, url=None):
+        """record what the current thread is doing, for diagnostics
+        :param state: a short description, None when the thread is done
+        """
+        ident = threading.get_ident()
+        if state:
+            self.activity[ident] = (state, url, time.time())
+        else:
+            self.activity.pop(ident, None)
+
     def get_url(self, url, headers=None, no_api=False):
         """retrieve JSON structure from a FamilySearch URL"""
-        self.counter += 1
+        try:
+            return self._get_url(url, headers, no_api)
+        finally:
+            self.set_activity()
+
+    def _get_url(self, url, headers, no_api):
+        self.metrics.request(url)
+        sampled = self.log_sampled()
+        attempt = 0
         if headers is None:
             headers = {"Accept": "application/x-gedcomx-v1+json"}
         headers.update(self.headers)
@@ -158,21 +254,52 @@ class Session(CachedSession):
         if no_api:
             base = "https://familysearch.org"
         while True:
+            attempt += 1
+            if attempt > 1:
+                self.metrics.retry(url)
             try:
-                self.write_log("Downloading: " + url)
-                r = self.get(base + url, timeout=self.timeout, headers=headers)
+                if sampled:
+                    self.write_log("Downloading: " + url, logging.DEBUG, url=url)
+                self.set_activity("waiting for a slot", url)
+                with self.scheduler.slot():
+                    self.set_activity("downloading", url)
+                    start = time.time()
+                    r = self.hedged_get(base + url, headers)
             except requests.exceptions.ReadTimeout:
-                self.write_log("Read timed out")
+                self.write_log("Read timed out", logging.WARNING, url=url)
+                self.metrics.response(url, "timeout")
+                self.scheduler.failure()
                 continue
             except requests.exceptions.ConnectionError:
-                self.write_log("Connection aborted")
+                self.write_log("Connection aborted", logging.WARNING, url=url)
+                self.metrics.response(url, "connection_error")
+                self.scheduler.failure()
+                self.set_activity("sleeping %ss" % self.timeout, url)
                 time.sleep(self.timeout)
                 continue
-            self.write_log("Status code: %s" % r.status_code)
+            latency = time.time() - start
+            from_cache = getattr(r, "from_cache", False)
+            self.metrics.response(
+                url, r.status_code, latency, len(r.content), from_cache
+            )
+            if sampled:
+                self.write_log(
+                    "Status code: %s" % r.status_code,
+                    logging.DEBUG,
+                    url=url,
+                    status=r.status_code,
+                    duration=round(latency, 3),
+                )
+            if r.status_code == 429 or r.status_code >= 500:
+                self.scheduler.failure()
+            elif not from_cache:
+                self.scheduler.success(latency)
             if r.status_code == 204:
                 return None
             if r.status_code in {404, 405, 410, 500}:
-                self.write_log("WARNING: " + url)
+                self.write_log(
+                    "WARNING: " + url, logging.WARNING, url=url, status=r.status_code
+                )
                 return None
             if r.status_code == 401:
                 self.login()
@@ -180,7 +307,9 @@ class Session(CachedSession):
             try:
                 r.raise_for_status()
             except requests.exceptions.HTTPError:
-                self.write_log("HTTPError")
+                self.write_log(
+                    "HTTPError", logging.WARNING, url=url, status=r.status_code
+                )
                 if r.status_code == 403:
                     if (
                         "message" in r.json()["errors"][0]
@@ -189,22 +318,80 @@ class Session(CachedSession):
                     ):
                         self.write_log(
                             "Unable to get ordinances. "
-                            "Try with an LDS account or without option -c."
+                            "Try with an LDS account or without option -c.",
+                            logging.WARNING,
+                            url=url,
+                            status=r.status_code,
                         )
                         return "error"
                     self.write_log(
                         "WARNING: code 403 from %s %s"
-                        % (url, r.json()["errors"][0]["message"] or "")
+                        % (url, r.json()["errors"][0]["message"] or ""),
+                        logging.WARNING,
+                        url=url,
+                        status=r.status_code,
                     )
                     return None
+                self.set_activity("sleeping %ss" % self.timeout, url)
                 time.sleep(self.timeout)
                 continue
             try:
                 return r.json()
             except Exception as e:
-                self.write_log("WARNING: corrupted file from %s, error: %s" % (url, e))
+                self.write_log(
+                    "WARNING: corrupted file from %s, error: %s" % (url, e),
+                    logging.WARNING,
+                    url=url,
+                )
                 return None
 
+    def hedged_get(self, url, headers):
+        """GET an URL, hedging against tail latency if enabled
+        the request runs on the hedge executor; if it has not answered after
+        the hedge percentile of the recent latencies, and less than
+        hedge_ratio of the requests have been duplicated, a duplicate runs
+        concurrently and the first answer is returned. The other request is
+        cancelled if it has not started, otherwise its response is closed
+        once it ends, within the usual timeout.
+        """
+        if not self.hedge:
+            return self.get(url, timeout=self.timeout, headers=headers)
+        threshold = self.scheduler.percentile(self.hedge_percentile, min_samples=20)
+        with self.hedge_lock:
+            self.hedge_requests += 1
+        if threshold is None:
+            return self.get(url, timeout=self.timeout, headers=headers)
+        futures = {
+            self.hedge_executor.submit(
+                self.get, url, timeout=self.timeout, headers=headers
+            )
+        }
+        if not wait(futures, timeout=threshold).done:
+            # the budget is only taken by the requests actually duplicated
+            with self.hedge_lock:
+                allowed = self.hedged < self.hedge_ratio * self.hedge_requests
+                if allowed:
+                    self.hedged += 1
+            if allowed:
+                self.write_log("Hedging: " + url, url=url)
+                futures.add(
+                    self.hedge_executor.submit(
+                        self.get, url, timeout=self.timeout, headers=headers
+                    )
+                )
+        error = None
+        for future in as_completed(futures):
+            try:
+                response = future.result()
+            except requests.exceptions.RequestException as e:
+                error = error or e
+                continue
+            for other in futures - {future}:
+                if not other.cancel():
+                    other.add_done_callback(close_response)
+            return response
+        raise error
+
     def set_current(self):
         """retrieve FamilySearch current user ID, name and language"""
         url = "/platform/users/current"
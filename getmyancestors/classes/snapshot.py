@@ -0,0 +1,270 @@
+"""Binary snapshots of a Tree
+A snapshot holds the pickled records of a tree and an index of their
+positions, so it loads much faster than a GEDCOM file, all at once or
+lazily. Pickle ties it to the classes of the code that saved it: a
+snapshot is only readable by the same version of getmyancestors, and is
+refused by any other. Only the classes of CLASSES are unpickled.
+"""
+
+# global imports
+import io
+import mmap
+import pickle
+import struct
+import itertools
+import threading
+from collections.abc import MutableMapping
+
+# local imports
+import getmyancestors
+
+# first bytes of a snapshot file, and version of its layout
+MAGIC = b"GMATREE\0"
+VERSION = 2
+# magic, version, offset and length of the index
+HEADER = struct.Struct("<8sIQQ")
+# GEDCOM identifier counters of a Tree
+COUNTERS = ("indi_nums", "fam_nums", "note_nums", "source_nums")
+# classes a snapshot is made of, by module, no other can be loaded
+CLASSES = {
+    "getmyancestors.classes.tree": {
+        "Indi",
+        "Fam",
+        "Source",
+        "Note",
+        "Fact",
+        "Memorie",
+        "Name",
+        "Ordinance",
+    },
+    "getmyancestors.classes.graph": {"Graph", "Adjacency"},
+    "array": {"array", "_array_reconstructor"},
+    "builtins": {"set", "frozenset"},
+}
+
+
+def is_snapshot(filename):
+    """tell if filename is a snapshot file"""
+    try:
+        with open(filename, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def save(tree, filename):
+    """write a snapshot of tree
+    The file holds a header, the pickled records, and an index of their
+    positions. Each individual, family and source is pickled apart, with
+    references to the tree, families, sources and notes it uses, so a
+    snapshot can be loaded lazily. A tree stored in a database is loaded
+    in memory to be saved.
+    :param tree: a Tree object
+    :param filename: the snapshot file name
+    """
+    notes = list(tree.notes)
+    records = {
+        name: [(key, getattr(tree, name)[key]) for key in getattr(tree, name)]
+        for name in ("indi", "fam", "sources")
+    }
+    nums = dict()
+    for name, values in zip(
+        COUNTERS,
+        (
+            [record for _, record in records["indi"]],
+            [record for _, record in records["fam"]],
+            notes,
+            [record for _, record in records["sources"]],
+        ),
+    ):
+        # reading a count consumes it
+        count = next(getattr(tree, name))
+        setattr(tree, name, itertools.count(count))
+        # the trees read from GEDCOM files number their records themselves
+        nums[name] = max([count] + [record.num + 1 for record in values])
+    # references by object id, the records are kept alive by the lists above
+    refs = {id(tree): ("tree",)}
+    refs.update((id(fam), ("fam",) + key) for key, fam in records["fam"])
+    refs.update((id(source), ("source", key)) for key, source in records["sources"])
+    with open(filename, "wb", buffering=1 << 20) as file:
+
+        def dump(record):
+            """pickle record and return its (offset, length)"""
+            offset = file.tell()
+            ref = refs.pop(id(record), None)
+            pickler = pickle.Pickler(file, pickle.HIGHEST_PROTOCOL)
+            # called for every object pickled, so kept minimal
+            pickler.persistent_id = lambda obj: refs.get(id(obj))
+            pickler.dump(record)
+            if ref:
+                refs[id(record)] = ref
+            return offset, file.tell() - offset
+
+        file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        index = dict()
+        # the notes are pickled together, then referenced by their index
+        index["notes"] = dump(notes)
+        refs.update((id(note), ("note", i)) for i, note in enumerate(notes))
+        for name in ("indi", "fam", "sources"):
+            index[name] = {key: dump(record) for key, record in records[name]}
+        state = {
+            "nums": nums,
+            "display_name": tree.display_name,
+            "lang": tree.lang,
+            "places": tree.places,
+            "graph": tree.graph,
+        }
+        index["state"] = dump(state)
+        index["version"] = getmyancestors.__version__
+        offset = file.tell()
+        pickle.dump(index, file, pickle.HIGHEST_PROTOCOL)
+        length = file.tell() - offset
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, VERSION, offset, length))
+
+
+class Unpickler(pickle.Unpickler):
+    """Unpickler refusing the classes a snapshot is not made of, so that a
+    crafted file can't call arbitrary functions when loaded
+    """
+
+    def find_class(self, module, name):
+        if name in CLASSES.get(module, ()):
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(
+            "%s.%s is not allowed in a snapshot" % (module, name)
+        )
+
+
+class Snapshot:
+    """Snapshot file mapped in memory, its records unpickled on demand
+    :param tree: the Tree object the records belong to
+    :param filename: the snapshot file name
+    """
+
+    def __init__(self, tree, filename):
+        self.tree = tree
+        self.lock = threading.RLock()
+        with open(filename, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, offset, length = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError("%s is not a snapshot file" % filename)
+        if version != VERSION:
+            self.map.close()
+            raise ValueError(
+                "%s is a version %s snapshot, version %s is supported"
+                % (filename, version, VERSION)
+            )
+        try:
+            index = Unpickler(io.BytesIO(self.map[offset : offset + length])).load()
+        except pickle.UnpicklingError:
+            self.map.close()
+            raise
+        if index.get("version") != getmyancestors.__version__:
+            self.map.close()
+            raise ValueError(
+                "%s was saved by getmyancestors %s, it can't be read by version %s"
+                % (filename, index.get("version"), getmyancestors.__version__)
+            )
+        self.indi = SnapshotDict(self, index["indi"])
+        self.fam = SnapshotDict(self, index["fam"])
+        self.sources = SnapshotDict(self, index["sources"])
+        self.notes = self.load(*index["notes"])
+        self.state = self.load(*index["state"])
+
+    def load(self, offset, length):
+        """unpickle the record at offset, resolving its references"""
+        with self.lock:
+            unpickler = Unpickler(io.BytesIO(self.map[offset : offset + length]))
+            unpickler.persistent_load = self.persistent_load
+            return unpickler.load()
+
+    def persistent_load(self, pid):
+        if pid[0] == "tree":
+            return self.tree
+        if pid[0] == "fam":
+            return self.fam[(pid[1], pid[2])]
+        if pid[0] == "source":
+            return self.sources[pid[1]]
+        if pid[0] == "note":
+            return self.notes[pid[1]]
+        raise pickle.UnpicklingError("unknown reference %r" % (pid,))
+
+    def close(self):
+        """unmap the file, the records not loaded yet are lost"""
+        self.map.close()
+
+
+class SnapshotDict(MutableMapping):
+    """Dict of the records of a snapshot, unpickled on first access
+    New keys are only kept in memory.
+    :param snapshot: a Snapshot object
+    :param index: dict of the (offset, length) of the records by key
+    """
+
+    def __init__(self, snapshot, index):
+        self.snapshot = snapshot
+        self.index = index
+        self.loaded = dict()
+
+    def __getitem__(self, key):
+        value = self.loaded.get(key)
+        if value is None:
+            with self.snapshot.lock:
+                value = self.loaded.get(key)
+                if value is None:
+                    value = self.loaded[key] = self.snapshot.load(*self.index[key])
+        return value
+
+    def __setitem__(self, key, value):
+        self.loaded[key] = value
+        if key not in self.index:
+            self.index[key] = None
+
+    def __delitem__(self, key):
+        del self.index[key]
+        self.loaded.pop(key, None)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+
+def load(tree, filename, lazy=False):
+    """load a snapshot into tree
+    :param tree: a Tree object, usually empty
+    :param filename: the snapshot file name
+    :param lazy: map the file in memory and unpickle the individuals,
+                 families and sources on first access, until tree.close()
+    """
+    snapshot = Snapshot(tree, filename)
+    state = snapshot.state
+    for name in COUNTERS:
+        setattr(tree, name, itertools.count(state["nums"][name]))
+    tree.display_name = state["display_name"]
+    tree.lang = state["lang"]
+    tree.places.update(state["places"])
+    tree.graph = state["graph"]
+    if lazy:
+        tree.snapshot = snapshot
+        tree.indi = snapshot.indi
+        tree.fam = snapshot.fam
+        tree.sources = snapshot.sources
+    else:
+        for name in ("indi", "fam", "sources"):
+            records = getattr(snapshot, name)
+            target = getattr(tree, name)
+            for key in records:
+                target[key] = records[key]
+        snapshot.close()
+    for note in snapshot.notes:
+        tree.notes.append(note)
+        if note.text not in tree.note_index:
+            tree.note_index[note.text] = note
@@ -0,0 +1,82 @@
+# global imports
+import io
+import os
+import threading
+
+# local imports
+from getmyancestors.classes.writer import BUFFER_SIZE, GedcomWriter
+
+# record kinds, in the order of the GEDCOM file
+KINDS = ("indi", "fam", "sour", "note")
+
+
+class Spool:
+    """Write GEDCOM records to spool files as soon as they are complete
+    Each kind of record goes to its own file in directory, in the order the
+    records are completed, with the identifiers they got at creation.
+    assemble() then writes the GEDCOM file: the header, the individuals,
+    the families, the sources, the notes and the trailer. The spool files
+    are flushed after each record, so they survive a failed download.
+    :param directory: directory of the spool files
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.filenames = {
+            kind: os.path.join(directory, "%s.ged" % kind) for kind in KINDS
+        }
+        self.files = {
+            kind: open(filename, "w", encoding="UTF-8")
+            for kind, filename in self.filenames.items()
+        }
+        self.counts = dict.fromkeys(KINDS, 0)
+        self.locks = {kind: threading.Lock() for kind in KINDS}
+
+    def write(self, kind, record):
+        """write a complete record
+        :param kind: "indi", "fam", "sour" or "note"
+        :param record: an Indi, Fam, Source or Note object
+        """
+        text = io.StringIO()
+        record.print(text)
+        with self.locks[kind]:
+            self.files[kind].write(text.getvalue())
+            self.files[kind].flush()
+            self.counts[kind] += 1
+
+    def assemble(self, tree, file, buffer_size=BUFFER_SIZE):
+        """write the GEDCOM file from the spool files
+        :param tree: the Tree object, for the header
+        :param file: a text or binary file object
+        :param buffer_size: characters collected before a write to the file
+        """
+        writer = GedcomWriter(file, buffer_size)
+        tree.print_header(writer)
+        for kind in KINDS:
+            self.files[kind].close()
+            with open(self.filenames[kind], encoding="UTF-8") as spool:
+                for block in iter(lambda: spool.read(buffer_size), ""):
+                    writer.write(block)
+                    writer.end_record()
+        writer.write("0 TRLR\n")
+        writer.flush()
+
+    def remove(self):
+        """close and delete the spool files"""
+        for kind in KINDS:
+            self.files[kind].close()
+            os.remove(self.filenames[kind])
+
+
+class Tee:
+    """Write complete records to several spools
+    :param spools: objects with a write(kind, record) method, like Spool
+    """
+
+    def __init__(self, spools):
+        self.spools = spools
+
+    def write(self, kind, record):
+        """write a complete record to every spool"""
+        for spool in self.spools:
+            spool.write(kind, record)
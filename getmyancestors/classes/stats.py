@@ -0,0 +1,175 @@
+# global imports
+import numpy
+
+# local imports
+from getmyancestors.classes.export import BIRTH, DEATH, date_year, life_event
+
+# generations followed from the roots, a stop for loops in bad data
+MAX_GENERATIONS = 200
+# lifespans kept, and the width of their histogram bins, in years
+MAX_LIFESPAN = 120
+LIFESPAN_BIN = 10
+# gender codes
+GENDERS = {"M": 1, "F": 2}
+
+
+class PersonTable:
+    """Individuals as NumPy arrays, one row per individual
+    Unknown years are 0, unknown parents and surnames -1. The statistics
+    are then computed on whole arrays rather than object by object.
+    :param indis: an iterable of Indi objects
+    """
+
+    def __init__(self, indis):
+        indis = list(indis)
+        self.fids = [indi.fid for indi in indis]
+        self.index = {fid: i for i, fid in enumerate(self.fids)}
+        self.surnames = list()
+        codes = dict()
+        nums, genders, births, deaths, fathers, mothers, surnames = (
+            [] for _ in range(7)
+        )
+        for indi in indis:
+            nums.append(indi.num or 0)
+            genders.append(GENDERS.get(indi.gender, 0))
+            birth = life_event(indi, BIRTH)
+            death = life_event(indi, DEATH)
+            births.append((birth and date_year(birth.date)) or 0)
+            deaths.append((death and date_year(death.date)) or 0)
+            father = mother = None
+            if indi.famc_fid:
+                father, mother = min(
+                    indi.famc_fid, key=lambda x: tuple(y or "" for y in x)
+                )
+            fathers.append(self.index.get(father, -1))
+            mothers.append(self.index.get(mother, -1))
+            surname = indi.name.surname if indi.name else None
+            if surname:
+                if surname not in codes:
+                    codes[surname] = len(self.surnames)
+                    self.surnames.append(surname)
+                surnames.append(codes[surname])
+            else:
+                surnames.append(-1)
+        self.num = numpy.array(nums, numpy.int64)
+        self.gender = numpy.array(genders, numpy.int8)
+        self.birth = numpy.array(births, numpy.int32)
+        self.death = numpy.array(deaths, numpy.int32)
+        self.father = numpy.array(fathers, numpy.int64)
+        self.mother = numpy.array(mothers, numpy.int64)
+        self.surname = numpy.array(surnames, numpy.int32)
+        # generations from the roots, set by pedigree()
+        self.depth = numpy.full(len(indis), -1, numpy.int32)
+
+    def __len__(self):
+        return len(self.fids)
+
+    def roots(self, fids=None):
+        """return the indexes of the root individuals
+        :param fids: the root fids, the individual with the smallest GEDCOM
+                     number (the first one downloaded) if None
+        """
+        if fids:
+            return numpy.array(
+                [self.index[fid] for fid in fids if fid in self.index], numpy.int64
+            )
+        if not len(self):
+            return numpy.zeros(0, numpy.int64)
+        return numpy.array([numpy.argmin(self.num)], numpy.int64)
+
+    def pedigree(self, roots):
+        """return the ancestors of roots, per generation, and set depth
+        Ancestors are counted with multiplicity (slots of the pedigree
+        chart) and once (distinct), and an individual's depth is the first
+        generation it appears in.
+        :param roots: indexes of the root individuals
+        """
+        self.depth[:] = -1
+        nodes = numpy.unique(roots)
+        counts = numpy.bincount(roots, minlength=len(self))[nodes]
+        counts = counts.astype(numpy.float64)
+        generations = list()
+        for generation in range(MAX_GENERATIONS):
+            if not len(nodes):
+                break
+            fresh = nodes[self.depth[nodes] < 0]
+            self.depth[fresh] = generation
+            expected = float(len(roots)) * 2.0**generation
+            slots = counts.sum()
+            generations.append(
+                {
+                    "generation": generation,
+                    "expected": expected,
+                    "slots": slots,
+                    "distinct": len(nodes),
+                    "completeness": slots / expected,
+                    "implex": 1.0 - len(nodes) / slots,
+                }
+            )
+            parents = numpy.concatenate((self.father[nodes], self.mother[nodes]))
+            weights = numpy.concatenate((counts, counts))
+            known = parents >= 0
+            summed = numpy.bincount(
+                parents[known], weights=weights[known], minlength=len(self)
+            )
+            nodes = numpy.flatnonzero(summed)
+            counts = summed[nodes]
+        return generations
+
+    def lifespans(self):
+        """return the lifespan distribution, in years"""
+        known = (self.birth > 0) & (self.death > 0)
+        ages = (self.death - self.birth)[known]
+        valid = (ages >= 0) & (ages <= MAX_LIFESPAN)
+        ages = ages[valid]
+        genders = self.gender[known][valid]
+        edges = numpy.arange(0, MAX_LIFESPAN + LIFESPAN_BIN + 1, LIFESPAN_BIN)
+        histogram, _ = numpy.histogram(ages, bins=edges)
+        by_gender = dict()
+        for gender, code in (("U", 0),) + tuple(GENDERS.items()):
+            selected = ages[genders == code]
+            if len(selected):
+                by_gender[gender] = float(selected.mean())
+        return {
+            "known": int(len(ages)),
+            "invalid": int((~valid).sum()),
+            "mean": float(ages.mean()) if len(ages) else None,
+            "median": float(numpy.median(ages)) if len(ages) else None,
+            "mean_by_gender": by_gender,
+            "histogram": [
+                {"from": int(start), "count": int(count)}
+                for start, count in zip(edges[:-1], histogram)
+            ],
+        }
+
+    def surname_counts(self, top=20):
+        """return the top most frequent surnames and their counts"""
+        known = self.surname[self.surname >= 0]
+        counts = numpy.bincount(known, minlength=len(self.surnames))
+        order = numpy.argsort(-counts, kind="stable")[:top]
+        return [(self.surnames[i], int(counts[i])) for i in order if counts[i]]
+
+    def report(self, roots=None, top=20):
+        """return the statistics of the table
+        :param roots: the root fids, see roots()
+        :param top: number of surnames reported
+        """
+        indexes = self.roots(roots)
+        generations = self.pedigree(indexes) if len(indexes) else []
+        ancestors = self.depth > 0
+        slots = sum(row["slots"] for row in generations[1:])
+        return {
+            "individuals": len(self),
+            "roots": [self.fids[i] for i in indexes],
+            "genders": {
+                gender: int((self.gender == code).sum())
+                for gender, code in (("U", 0),) + tuple(GENDERS.items())
+            },
+            "birth_years": int((self.birth > 0).sum()),
+            "death_years": int((self.death > 0).sum()),
+            "generations": generations,
+            "ancestors": int(ancestors.sum()),
+            "pedigree_collapse": 1.0 - ancestors.sum() / slots if slots else 0.0,
+            "lifespans": self.lifespans(),
+            "surnames": self.surname_counts(top),
+        }
@@ -0,0 +1,327 @@
+# global imports
+import io
+import os
+import json
+import pickle
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+# rows read at once when iterating over a table
+PAGE_SIZE = 1000
+
+
+def encode_key(key):
+    """return the text stored for a dict key (a string or a tuple)"""
+    return json.dumps(key)
+
+
+def decode_key(text):
+    """return the dict key stored as text"""
+    key = json.loads(text)
+    return tuple(key) if isinstance(key, list) else key
+
+
+class Database:
+    """Temporary sqlite database holding the objects of a Tree
+    Objects are pickled, and the objects the tree stores apart (see
+    Tree.persistent_id) are saved as references to them.
+    :param tree: the Tree object
+    :param directory: directory of the database file, the default temporary
+                      directory if None
+    :param cache_size: number of objects kept in memory per table
+    """
+
+    def __init__(self, tree, directory=None, cache_size=10000):
+        self.tree = tree
+        self.cache_size = cache_size
+        fd, self.filename = tempfile.mkstemp(
+            prefix="getmyancestors-", suffix=".sqlite", dir=directory
+        )
+        os.close(fd)
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(self.filename, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=OFF")
+        self.connection.execute("PRAGMA synchronous=OFF")
+
+    def dumps(self, value):
+        """pickle value, saving the objects stored apart as references"""
+        buffer = io.BytesIO()
+        pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = lambda obj: (
+            None if obj is value else self.tree.persistent_id(obj)
+        )
+        pickler.dump(value)
+        return buffer.getvalue()
+
+    def loads(self, data):
+        """unpickle data, resolving the references"""
+        unpickler = pickle.Unpickler(io.BytesIO(data))
+        unpickler.persistent_load = self.tree.persistent_load
+        return unpickler.load()
+
+    def execute(self, sql, parameters=()):
+        """execute a statement and return all the rows"""
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def dict(self, name, order=None):
+        """return a DiskDict stored in the table name
+        :param order: see DiskDict
+        """
+        return DiskDict(self, name, order)
+
+    def list(self, name):
+        """return a DiskList stored in the table name"""
+        return DiskList(self, name)
+
+    def close(self):
+        """close and delete the database"""
+        with self.lock:
+            self.connection.close()
+        os.remove(self.filename)
+
+
+class DiskDict(MutableMapping):
+    """Dict stored in a database table, with an LRU cache of its values
+    A value is written when it leaves the cache if it was modified in memory:
+    a new value, or a value pinned to be modified (see pinned). Pinned values
+    are kept apart and never evicted, so a key is never mapped to two
+    different objects while one of them is being modified. Values must only
+    be modified while pinned, a value read again once it left the cache is a
+    new object.
+    :param database: a Database object
+    :param name: the table name
+    :param order: name of an integer attribute of the values, saved in a
+                  column to iterate over them in its order (see ordered_values)
+    """
+
+    def __init__(self, database, name, order=None):
+        self.database = database
+        self.name = name
+        self.order = order
+        self.cache = OrderedDict()
+        # keys of the cached values to write when they leave the cache
+        self.dirty = set()
+        # pinned values and the number of times they are pinned, by key
+        self.pins = dict()
+        database.execute(
+            "CREATE TABLE IF NOT EXISTS %s "
+            "(key TEXT PRIMARY KEY, num INTEGER, value BLOB)" % name
+        )
+
+    def _num(self, value):
+        return getattr(value, self.order) if self.order else None
+
+    def _write(self, key, value):
+        self.database.execute(
+            "UPDATE %s SET num = ?, value = ? WHERE key = ?" % self.name,
+            (self._num(value), self.database.dumps(value), encode_key(key)),
+        )
+
+    def _evict(self):
+        while len(self.cache) > self.database.cache_size:
+            key, value = self.cache.popitem(last=False)
+            if key in self.dirty:
+                self.dirty.remove(key)
+                self._write(key, value)
+
+    def _cache(self, key, value):
+        self.cache[key] = value
+        self.cache.move_to_end(key)
+        self._evict()
+
+    def _load(self, key):
+        rows = self.database.execute(
+            "SELECT value FROM %s WHERE key = ?" % self.name, (encode_key(key),)
+        )
+        if not rows:
+            raise KeyError(key)
+        return self.database.loads(rows[0][0])
+
+    def __getitem__(self, key):
+        with self.database.lock:
+            if key in self.pins:
+                return self.pins[key][0]
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+            value = self._load(key)
+            self._cache(key, value)
+            return value
+
+    def __setitem__(self, key, value):
+        with self.database.lock:
+            # the row keeps the place of the key in the iteration order, the
+            # value is only pickled when it leaves the cache
+            self.database.execute(
+                "INSERT INTO %s (key, num) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET num = excluded.num" % self.name,
+                (encode_key(key), self._num(value)),
+            )
+            if key in self.pins:
+                self.pins[key][0] = value
+                return
+            self.dirty.add(key)
+            self._cache(key, value)
+
+    def __delitem__(self, key):
+        with self.database.lock:
+            if key not in self:
+                raise KeyError(key)
+            self.pins.pop(key, None)
+            self.cache.pop(key, None)
+            self.dirty.discard(key)
+            self.database.execute(
+                "DELETE FROM %s WHERE key = ?" % self.name, (encode_key(key),)
+            )
+
+    def __contains__(self, key):
+        with self.database.lock:
+            return (
+                key in self.pins
+                or key in self.cache
+                or bool(
+                    self.database.execute(
+                        "SELECT 1 FROM %s WHERE key = ?" % self.name,
+                        (encode_key(key),),
+                    )
+                )
+            )
+
+    def pin(self, key):
+        """keep the value of key in memory until unpin, and return it"""
+        with self.database.lock:
+            if key not in self.pins:
+                if key in self.cache:
+                    value = self.cache.pop(key)
+                else:
+                    value = self._load(key)
+                self.pins[key] = [value, 0]
+            self.pins[key][1] += 1
+            return self.pins[key][0]
+
+    def unpin(self, key):
+        """release a value pinned by pin, it is written when it leaves the
+        cache once it is not pinned anymore
+        """
+        with self.database.lock:
+            self.pins[key][1] -= 1
+            if not self.pins[key][1]:
+                value = self.pins.pop(key)[0]
+                self.dirty.add(key)
+                self._cache(key, value)
+
+    @contextmanager
+    def pinned(self, key):
+        """context manager pinning the value of key, to modify it"""
+        value = self.pin(key)
+        try:
+            yield value
+        finally:
+            self.unpin(key)
+
+    def ordered_values(self):
+        """iterate over the values in the order of their attribute order,
+        loading each value not in memory once, without caching it
+        """
+        num = rowid = -1
+        while True:
+            with self.database.lock:
+                rows = self.database.execute(
+                    "SELECT num, rowid, key, value FROM %s WHERE (num, rowid) > (?, ?) "
+                    "ORDER BY num, rowid LIMIT ?" % self.name,
+                    (num, rowid, PAGE_SIZE),
+                )
+                page = list()
+                for num, rowid, key, value in rows:
+                    key = decode_key(key)
+                    if key in self.pins:
+                        page.append((self.pins[key][0], None))
+                    elif key in self.cache:
+                        page.append((self.cache[key], None))
+                    else:
+                        page.append((None, value))
+            if not rows:
+                return
+            for value, data in page:
+                yield self.database.loads(data) if data is not None else value
+
+    def __iter__(self):
+        rowid = 0
+        while True:
+            rows = self.database.execute(
+                "SELECT rowid, key FROM %s WHERE rowid > ? ORDER BY rowid LIMIT ?"
+                % self.name,
+                (rowid, PAGE_SIZE),
+            )
+            if not rows:
+                return
+            for rowid, key in rows:
+                yield decode_key(key)
+
+    def __len__(self):
+        return self.database.execute("SELECT count(*) FROM %s" % self.name)[0][0]
+
+
+class DiskList:
+    """Append-only list stored in a database table, with a cache of its
+    last values
+    A value is written once, when it leaves the cache, and must not be
+    modified after that.
+    :param database: a Database object
+    :param name: the table name
+    """
+
+    def __init__(self, database, name):
+        self.database = database
+        self.name = name
+        # values not written yet, by their position in the list
+        self.cache = OrderedDict()
+        database.execute(
+            "CREATE TABLE IF NOT EXISTS %s (num INTEGER PRIMARY KEY, value BLOB)" % name
+        )
+        self.count = database.execute("SELECT count(*) FROM %s" % name)[0][0]
+
+    def _write(self, num, value):
+        self.database.execute(
+            "INSERT INTO %s (num, value) VALUES (?, ?)" % self.name,
+            (num, self.database.dumps(value)),
+        )
+
+    def _evict(self):
+        while len(self.cache) > self.database.cache_size:
+            self._write(*self.cache.popitem(last=False))
+
+    def append(self, value):
+        """add value at the end of the list"""
+        with self.database.lock:
+            self.count += 1
+            self.cache[self.count] = value
+            self._evict()
+
+    def __iter__(self):
+        with self.database.lock:
+            cached = sorted(self.cache.items(), key=lambda x: x[0])
+        cached.reverse()
+        num = 0
+        while True:
+            rows = self.database.execute(
+                "SELECT num, value FROM %s WHERE num > ? ORDER BY num LIMIT ?"
+                % self.name,
+                (num, PAGE_SIZE),
+            )
+            if not rows:
+                break
+            for num, value in rows:
+                while cached and cached[-1][0] < num:
+                    yield cached.pop()[1]
+                yield self.database.loads(value)
+        while cached:
+            yield cached.pop()[1]
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,156 @@
+# global imports
+import json
+import time
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# local imports
+import getmyancestors
+
+# query parameters which must not be written in a trace
+SECRETS = {"username", "password", "code", "access_token"}
+
+
+def redact(url):
+    """hide credentials in the query string of an URL"""
+    parts = urlsplit(url)
+    if not parts.query:
+        return url
+    query = [
+        (key, "***" if key in SECRETS else value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query, safe=",")))
+
+
+class Tracer:
+    """Record the HTTP requests of a Session for waterfall analysis"""
+
+    def __init__(self):
+        self.entries = list()
+        self._lock = threading.Lock()
+
+    def record(self, method, url, start, end, phase, response=None, error=None):
+        """record a request
+        :param start: start timestamp in seconds
+        :param end: end timestamp in seconds
+        :param phase: crawl phase during which the request was sent
+        :param response: a Response object or None on error
+        :param error: the exception raised by the request
+        """
+        thread = threading.current_thread()
+        entry = {
+            "method": method,
+            "url": redact(url),
+            "start": start,
+            "end": end,
+            "thread": thread.name,
+            "tid": thread.ident,
+            "phase": phase,
+            "status": 0,
+            "from_cache": False,
+            "request_size": 0,
+            "response_size": 0,
+            "mime_type": "",
+            "error": type(error).__name__ if error else None,
+        }
+        if response is not None:
+            body = response.request.body if response.request is not None else None
+            entry.update(
+                status=response.status_code,
+                from_cache=getattr(response, "from_cache", False),
+                request_size=len(body or ""),
+                response_size=len(response.content or b""),
+                mime_type=response.headers.get("Content-Type", ""),
+            )
+        with self._lock:
+            self.entries.append(entry)
+
+    def to_har(self):
+        """return the trace as a HAR 1.2 structure"""
+        entries = list()
+        for e in sorted(self.entries, key=lambda x: x["start"]):
+            duration = round((e["end"] - e["start"]) * 1000, 3)
+            entries.append(
+                {
+                    "startedDateTime": time.strftime(
+                        "%Y-%m-%dT%H:%M:%S", time.gmtime(e["start"])
+                    )
+                    + ".%03dZ" % (e["start"] % 1 * 1000),
+                    "time": duration,
+                    "request": {
+                        "method": e["method"],
+                        "url": e["url"],
+                        "httpVersion": "HTTP/1.1",
+                        "cookies": [],
+                        "headers": [],
+                        "queryString": [],
+                        "headersSize": -1,
+                        "bodySize": e["request_size"],
+                    },
+                    "response": {
+                        "status": e["status"],
+                        "statusText": e["error"] or "",
+                        "httpVersion": "HTTP/1.1",
+                        "cookies": [],
+                        "headers": [],
+                        "content": {
+                            "size": e["response_size"],
+                            "mimeType": e["mime_type"],
+                        },
+                        "redirectURL": "",
+                        "headersSize": -1,
+                        "bodySize": e["response_size"],
+                    },
+                    "cache": {},
+                    "timings": {"send": 0, "wait": duration, "receive": 0},
+                    "_thread": e["thread"],
+                    "_phase": e["phase"],
+                    "_fromCache": e["from_cache"],
+                }
+            )
+        return {
+            "log": {
+                "version": "1.2",
+                "creator": {
+                    "name": "getmyancestors",
+                    "version": getmyancestors.__version__,
+                },
+                "entries": entries,
+            }
+        }
+
+    def to_chrome(self):
+        """return the trace in Chrome trace event format"""
+        events = list()
+        origin = min((e["start"] for e in self.entries), default=0)
+        for e in self.entries:
+            events.append(
+                {
+                    "name": "%s %s" % (e["method"], e["url"]),
+                    "cat": e["phase"] or "",
+                    "ph": "X",
+                    "ts": round((e["start"] - origin) * 1e6),
+                    "dur": round((e["end"] - e["start"]) * 1e6),
+                    "pid": 1,
+                    "tid": e["tid"],
+                    "args": {
+                        "status": e["status"],
+                        "from_cache": e["from_cache"],
+                        "request_size": e["request_size"],
+                        "response_size": e["response_size"],
+                        "thread": e["thread"],
+                        "error": e["error"],
+                    },
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(self, file, fmt="har"):
+        """write the trace
+        :param fmt: "har" or "chrome"
+        """
+        with self._lock:
+            data = self.to_chrome() if fmt == "chrome" else self.to_har()
+        json.dump(data, file)
+        file.write("\n")
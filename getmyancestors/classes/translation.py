@@ -172,6 +172,9 @@ translations = {
     "Please add GEDCOM files": {"fr": "Veuillez ajouter des fichiers GEDCOM"},
     "Error": {"fr": "Erreur"},
     "Info": {"fr": "Info"},
+    "Tools": {"fr": "Outils"},
+    "Dump diagnostics": {"fr": "Écrire les diagnostics"},
+    "Diagnostics written to %s": {"fr": "Diagnostics écrits dans %s"},
     "Name": {"fr": "Nom"},
     "Warning: This tool should only be used to merge GEDCOM files from this software. If you use other GEDCOM files, the result is not guaranteed.": {
         "fr": "Attention : Cet outil ne devrait être utilisé qu'avec des fichiers GEDCOM provenants de ce logiciel. Si vous utilisez d'autres fichiers GEDCOM, le résultat n'est pas garanti."
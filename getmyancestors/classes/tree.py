@@ -1,7 +1,14 @@
+import io
+import os
 import sys
-import re
 import time
+import pickle
 import asyncio
+import itertools
+import threading
+from contextlib import nullcontext
+from bisect import bisect_right
+from multiprocessing import get_all_start_methods, get_context
 from urllib.parse import unquote
 
 # global imports
@@ -9,37 +16,122 @@ import babelfish
 
 # local imports
 import getmyancestors
+from getmyancestors.classes.graph import Graph
+from getmyancestors.classes.storage import Database, DiskDict
+from getmyancestors.classes import snapshot
+from getmyancestors.classes.writer import BUFFER_SIZE, GedcomWriter
 from getmyancestors.classes.constants import (
     MAX_PERSONS,
+    PRINT_CHUNK,
+    MAX_LINE,
+    MAX_CONT,
+    LOCK_STRIPES,
+    SPACES,
     FACT_EVEN,
     FACT_TAGS,
     ORDINANCES_STATUS,
 )
 
-
 # getmyancestors classes and functions
+EMPTY = frozenset()
+
+
+class LazySet:
+    """Descriptor of a set attribute of a slotted class
+    No set is allocated until the first mutation, the value is kept in the
+    slot named after the attribute with a leading underscore. Reading an
+    attribute not allocated yet returns the shared EMPTY frozenset, so
+    mutations go through LazySets.mutable.
+    """
+
+    def __set_name__(self, owner, name):
+        self.slot = "_" + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = getattr(obj, self.slot)
+        return EMPTY if value is None else value
+
+    def __set__(self, obj, value):
+        if not value:
+            value = None
+        elif not isinstance(value, set):
+            value = set(value)
+        setattr(obj, self.slot, value)
+
+
+class LazySets:
+    """Base of the slotted classes with LazySet attributes"""
+
+    __slots__ = ()
+
+    def mutable(self, name):
+        """return the set attribute name, allocating it if necessary
+        Like any other mutation, call it while holding the lock of the object.
+        :param name: the name of a LazySet attribute
+        """
+        slot = "_" + name
+        value = getattr(self, slot)
+        if value is None:
+            value = set()
+            setattr(self, slot, value)
+        return value
+
+
+def byte_offsets(line):
+    """return the UTF-8 offset of each character of line, and of its end"""
+    offsets = [0]
+    total = 0
+    for char in line:
+        code = ord(char)
+        total += 1 if code < 0x80 else 2 if code < 0x800 else 3 if code < 0x10000 else 4
+        offsets.append(total)
+    return offsets
+
+
+def fold(line, max_len=MAX_LINE):
+    """split a line in chunks of at most max_len UTF-8 bytes for the first one
+    and MAX_CONT for the next ones, never next to a space or a tab
+    """
+    encoded = line.encode("utf-8")
+    if len(encoded) <= max_len:
+        return [line]
+    ascii = len(encoded) == len(line)
+    offsets = range(len(line) + 1) if ascii else byte_offsets(line)
+    chunks = list()
+    start = 0
+    end = len(line)
+    while offsets[end] - offsets[start] > max_len:
+        index = min(max_len, end - start - 2)
+        if not ascii:
+            # longest chunk fitting in max_len bytes
+            fits = bisect_right(
+                offsets, offsets[start] + max_len, start, start + index + 1
+            )
+            index = max(min(index, fits - 1 - start), 1)
+        while index > 1 and (
+            line[start + index - 1] in SPACES or line[start + index] in SPACES
+        ):
+            index -= 1
+        chunks.append(line[start : start + index])
+        start += index
+        max_len = MAX_CONT
+    chunks.append(line[start:])
+    return chunks
+
+
 def cont(string):
     """parse a GEDCOM line adding CONT and CONT tags if necessary"""
+    # the line breaks of splitlines(), "\n" among them, are not printable
+    if len(string.encode()) <= MAX_LINE and string.isprintable():
+        return string + "\n"
     level = int(string[:1]) + 1
-    lines = string.splitlines()
     res = list()
-    max_len = 255
-    for line in lines:
-        c_line = line
-        to_conc = list()
-        while len(c_line.encode("utf-8")) > max_len:
-            index = min(max_len, len(c_line) - 2)
-            while (
-                len(c_line[:index].encode("utf-8")) > max_len
-                or re.search(r"[ \t\v]", c_line[index - 1 : index + 1])
-            ) and index > 1:
-                index -= 1
-            to_conc.append(c_line[:index])
-            c_line = c_line[index:]
-            max_len = 248
-        to_conc.append(c_line)
-        res.append(("\n%s CONC " % level).join(to_conc))
-        max_len = 248
+    max_len = MAX_LINE
+    for line in string.splitlines():
+        res.append(("\n%s CONC " % level).join(fold(line, max_len)))
+        max_len = MAX_CONT
     return ("\n%s CONT " % level).join(res) + "\n"
 
 
@@ -50,14 +142,13 @@ class Note:
     :param num: the GEDCOM identifier
     """
 
-    counter = 0
+    __slots__ = ("num", "text")
 
     def __init__(self, text="", tree=None, num=None):
         if num:
             self.num = num
         else:
-            Note.counter += 1
-            self.num = Note.counter
+            self.num = next(tree.note_nums)
         self.text = text.strip()
 
         if tree:
@@ -72,25 +163,25 @@ class Note:
         file.write("%s NOTE @N%s@\n" % (level, self.num))
 
 
-class Source:
+class Source(LazySets):
     """GEDCOM Source class
     :param data: FS Source data
     :param tree: a Tree object
     :param num: the GEDCOM identifier
     """
 
-    counter = 0
+    __slots__ = ("num", "tree", "url", "citation", "title", "fid", "_notes")
+    notes = LazySet()
 
     def __init__(self, data=None, tree=None, num=None):
         if num:
             self.num = num
         else:
-            Source.counter += 1
-            self.num = Source.counter
+            self.num = next(tree.source_nums)
 
         self.tree = tree
         self.url = self.citation = self.title = self.fid = None
-        self.notes = set()
+        self._notes = None
         if data:
             self.fid = data["id"]
             if "about" in data:
@@ -105,7 +196,7 @@ class Source:
             if "notes" in data:
                 for n in data["notes"]:
                     if n["text"]:
-                        self.notes.add(Note(n["text"], self.tree))
+                        self.mutable("notes").add(self.tree.add_note(n["text"]))
 
     def print(self, file=sys.stdout):
         """print Source in GEDCOM format"""
@@ -131,11 +222,13 @@ class Fact:
     :param tree: a tree object
     """
 
+    __slots__ = ("value", "type", "date", "place", "note", "map")
+
     def __init__(self, data=None, tree=None):
         self.value = self.type = self.date = self.place = self.note = self.map = None
         if data:
             if "value" in data:
-                self.value = data["value"]
+                self.value = tree.intern(data["value"])
             if "type" in data:
                 self.type = data["type"]
                 if self.type in FACT_EVEN:
@@ -144,15 +237,16 @@ class Fact:
                     self.type = unquote(self.type[6:])
                 elif self.type not in FACT_TAGS:
                     self.type = None
+                self.type = tree.intern(self.type)
             if "date" in data:
-                self.date = data["date"]["original"]
+                self.date = tree.intern(data["date"]["original"])
             if "place" in data:
                 place = data["place"]
-                self.place = place["original"]
+                self.place = tree.intern(place["original"])
                 if "description" in place and place["description"][1:] in tree.places:
                     self.map = tree.places[place["description"][1:]]
             if "changeMessage" in data["attribution"]:
-                self.note = Note(data["attribution"]["changeMessage"], tree)
+                self.note = tree.add_note(data["attribution"]["changeMessage"])
             if self.type == "http://gedcomx.org/Death" and not (
                 self.date or self.place
             ):
@@ -189,6 +283,8 @@ class Memorie:
     :param data: FS Memorie data
     """
 
+    __slots__ = ("description", "url")
+
     def __init__(self, data=None):
         self.description = self.url = None
         if data and "links" in data:
@@ -215,6 +311,8 @@ class Name:
     :param tree: a Tree object
     """
 
+    __slots__ = ("given", "surname", "prefix", "suffix", "note")
+
     def __init__(self, data=None, tree=None):
         self.given = ""
         self.surname = ""
@@ -225,15 +323,15 @@ class Name:
             if "parts" in data["nameForms"][0]:
                 for z in data["nameForms"][0]["parts"]:
                     if z["type"] == "http://gedcomx.org/Given":
-                        self.given = z["value"]
+                        self.given = tree.intern(z["value"])
                     if z["type"] == "http://gedcomx.org/Surname":
-                        self.surname = z["value"]
+                        self.surname = tree.intern(z["value"])
                     if z["type"] == "http://gedcomx.org/Prefix":
-                        self.prefix = z["value"]
+                        self.prefix = tree.intern(z["value"])
                     if z["type"] == "http://gedcomx.org/Suffix":
-                        self.suffix = z["value"]
+                        self.suffix = tree.intern(z["value"])
             if "changeMessage" in data["attribution"]:
-                self.note = Note(data["attribution"]["changeMessage"], tree)
+                self.note = tree.add_note(data["attribution"]["changeMessage"])
 
     def print(self, file=sys.stdout, typ=None):
         """print Name in GEDCOM format
@@ -256,6 +354,8 @@ class Ordinance:
     :param data: FS Ordinance data
     """
 
+    __slots__ = ("date", "temple_code", "status", "famc")
+
     def __init__(self, data=None):
         self.date = self.temple_code = self.status = self.famc = None
         if data:
@@ -277,79 +377,73 @@ class Ordinance:
             file.write("2 FAMC @F%s@\n" % self.famc.num)
 
 
-class Indi:
+class Indi(LazySets):
     """GEDCOM individual class
     :param fid' FamilySearch id
     :param tree: a tree object
     :param num: the GEDCOM identifier
     """
 
-    counter = 0
+    __slots__ = (
+        "num",
+        "fid",
+        "tree",
+        "name",
+        "gender",
+        "living",
+        "baptism",
+        "confirmation",
+        "initiatory",
+        "endowment",
+        "sealing_child",
+        "_famc_fid",
+        "_fams_fid",
+        "_famc_num",
+        "_fams_num",
+        "_nicknames",
+        "_facts",
+        "_birthnames",
+        "_married",
+        "_aka",
+        "_notes",
+        "_sources",
+        "_memories",
+    )
+    famc_fid = LazySet()
+    fams_fid = LazySet()
+    famc_num = LazySet()
+    fams_num = LazySet()
+    nicknames = LazySet()
+    facts = LazySet()
+    birthnames = LazySet()
+    married = LazySet()
+    aka = LazySet()
+    notes = LazySet()
+    sources = LazySet()
+    memories = LazySet()
 
     def __init__(self, fid=None, tree=None, num=None):
         if num:
             self.num = num
         else:
-            Indi.counter += 1
-            self.num = Indi.counter
+            self.num = next(tree.indi_nums)
         self.fid = fid
         self.tree = tree
-        self.famc_fid = set()
-        self.fams_fid = set()
-        self.famc_num = set()
-        self.fams_num = set()
         self.name = None
         self.gender = None
         self.living = None
-        self.parents = set()
-        self.spouses = set()
-        self.children = set()
         self.baptism = self.confirmation = self.initiatory = None
         self.endowment = self.sealing_child = None
-        self.nicknames = set()
-        self.facts = set()
-        self.birthnames = set()
-        self.married = set()
-        self.aka = set()
-        self.notes = set()
-        self.sources = set()
-        self.memories = set()
+        self._famc_fid = self._fams_fid = self._famc_num = self._fams_num = None
+        self._nicknames = self._facts = self._birthnames = None
+        self._married = self._aka = None
+        self._notes = self._sources = self._memories = None
 
     def add_data(self, data):
         """add FS individual data"""
         if data:
-            self.living = data["living"]
-            for x in data["names"]:
-                if x["preferred"]:
-                    self.name = Name(x, self.tree)
-                else:
-                    if x["type"] == "http://gedcomx.org/Nickname":
-                        self.nicknames.add(Name(x, self.tree))
-                    if x["type"] == "http://gedcomx.org/BirthName":
-                        self.birthnames.add(Name(x, self.tree))
-                    if x["type"] == "http://gedcomx.org/AlsoKnownAs":
-                        self.aka.add(Name(x, self.tree))
-                    if x["type"] == "http://gedcomx.org/MarriedName":
-                        self.married.add(Name(x, self.tree))
-            if "gender" in data:
-                if data["gender"]["type"] == "http://gedcomx.org/Male":
-                    self.gender = "M"
-                elif data["gender"]["type"] == "http://gedcomx.org/Female":
-                    self.gender = "F"
-                elif data["gender"]["type"] == "http://gedcomx.org/Unknown":
-                    self.gender = "U"
-            if "facts" in data:
-                for x in data["facts"]:
-                    if x["type"] == "http://familysearch.org/v1/LifeSketch":
-                        self.notes.add(
-                            Note(
-                                "=== %s ===\n%s"
-                                % (self.tree.fs._("Life Sketch"), x.get("value", "")),
-                                self.tree,
-                            )
-                        )
-                    else:
-                        self.facts.add(Fact(x, self.tree))
+            with self.tree.lock_for(self.fid):
+                self.add_person(data)
             if "sources" in data:
                 sources = self.tree.fs.get_url(
                     "/platform/tree/persons/%s/sources" % self.fid
@@ -362,44 +456,101 @@ class Indi:
                             if "changeMessage" in quote["attribution"]
                             else None
                         )
-                    for source in sources["sourceDescriptions"]:
-                        if source["id"] not in self.tree.sources:
-                            self.tree.sources[source["id"]] = Source(source, self.tree)
-                        self.sources.add(
-                            (self.tree.sources[source["id"]], quotes[source["id"]])
-                        )
+                    links = [
+                        (self.tree.add_source(source), quotes[source["id"]])
+                        for source in sources["sourceDescriptions"]
+                    ]
+                    with self.tree.lock_for(self.fid):
+                        self.mutable("sources").update(links)
             for evidence in data.get("evidence", []):
                 memory_id, *_ = evidence["id"].partition("-")
                 url = "/platform/memories/memories/%s" % memory_id
                 memorie = self.tree.fs.get_url(url)
                 if memorie and "sourceDescriptions" in memorie:
-                    for x in memorie["sourceDescriptions"]:
-                        if x["mediaType"] == "text/plain":
-                            text = "\n".join(
-                                val.get("value", "")
-                                for val in x.get("titles", [])
-                                + x.get("descriptions", [])
-                            )
-                            self.notes.add(Note(text, self.tree))
-                        else:
-                            self.memories.add(Memorie(x))
+                    with self.tree.lock_for(self.fid):
+                        for x in memorie["sourceDescriptions"]:
+                            if x["mediaType"] == "text/plain":
+                                text = "\n".join(
+                                    val.get("value", "")
+                                    for val in x.get("titles", [])
+                                    + x.get("descriptions", [])
+                                )
+                                self.mutable("notes").add(self.tree.add_note(text))
+                            else:
+                                self.mutable("memories").add(Memorie(x))
+
+    def add_person(self, data):
+        """add the names, gender and facts of FS individual data"""
+        self.living = data["living"]
+        for x in data["names"]:
+            if x["preferred"]:
+                self.name = Name(x, self.tree)
+            else:
+                if x["type"] == "http://gedcomx.org/Nickname":
+                    self.mutable("nicknames").add(Name(x, self.tree))
+                if x["type"] == "http://gedcomx.org/BirthName":
+                    self.mutable("birthnames").add(Name(x, self.tree))
+                if x["type"] == "http://gedcomx.org/AlsoKnownAs":
+                    self.mutable("aka").add(Name(x, self.tree))
+                if x["type"] == "http://gedcomx.org/MarriedName":
+                    self.mutable("married").add(Name(x, self.tree))
+        if "gender" in data:
+            if data["gender"]["type"] == "http://gedcomx.org/Male":
+                self.gender = "M"
+            elif data["gender"]["type"] == "http://gedcomx.org/Female":
+                self.gender = "F"
+            elif data["gender"]["type"] == "http://gedcomx.org/Unknown":
+                self.gender = "U"
+        if "facts" in data:
+            for x in data["facts"]:
+                if x["type"] == "http://familysearch.org/v1/LifeSketch":
+                    self.mutable("notes").add(
+                        self.tree.add_note(
+                            "=== %s ===\n%s"
+                            % (self.tree.fs._("Life Sketch"), x.get("value", ""))
+                        )
+                    )
+                else:
+                    self.mutable("facts").add(Fact(x, self.tree))
+
+    @property
+    def parents(self):
+        """(father, mother) couples of the parents, from the tree graph"""
+        if not self.tree:
+            return set()
+        return set((f, m) for f, m, _ in self.tree.graph.parents((self.fid,)))
+
+    @property
+    def children(self):
+        """(father, mother, child) relationships, from the tree graph"""
+        if not self.tree:
+            return set()
+        return set(self.tree.graph.children((self.fid,)))
+
+    @property
+    def spouses(self):
+        """(person1, person2, relfid) relationships, from the tree graph"""
+        if not self.tree:
+            return set()
+        return set(self.tree.graph.spouses((self.fid,)))
 
     def add_fams(self, fams):
         """add family fid (for spouse or parent)"""
-        self.fams_fid.add(fams)
+        self.mutable("fams_fid").add(fams)
 
     def add_famc(self, famc):
         """add family fid (for child)"""
-        self.famc_fid.add(famc)
+        self.mutable("famc_fid").add(famc)
 
     def get_notes(self):
         """retrieve individual notes"""
         notes = self.tree.fs.get_url("/platform/tree/persons/%s/notes" % self.fid)
         if notes:
-            for n in notes["persons"][0]["notes"]:
-                text_note = "=== %s ===\n" % n["subject"] if "subject" in n else ""
-                text_note += n["text"] + "\n" if "text" in n else ""
-                self.notes.add(Note(text_note, self.tree))
+            with self.tree.lock_for(self.fid):
+                for n in notes["persons"][0]["notes"]:
+                    text_note = "=== %s ===\n" % n["subject"] if "subject" in n else ""
+                    text_note += n["text"] + "\n" if "text" in n else ""
+                    self.mutable("notes").add(self.tree.add_note(text_note))
 
     def get_ordinances(self):
         """retrieve LDS ordinances
@@ -411,7 +562,9 @@ class Indi:
             return res, famc
         url = "/service/tree/tree-data/reservations/person/%s/ordinances" % self.fid
         data = self.tree.fs.get_url(url, {}, no_api=True)
-        if data:
+        if not data:
+            return res, famc
+        with self.tree.lock_for(self.fid):
             for key, o in data["data"].items():
                 if key == "baptism":
                     self.baptism = Ordinance(o)
@@ -447,11 +600,9 @@ class Indi:
                 self.tree.fs._("Contributors"),
                 "\n".join(sorted(temp)),
             )
-            for n in self.tree.notes:
-                if n.text == text:
-                    self.notes.add(n)
-                    return
-            self.notes.add(Note(text, self.tree))
+            note = self.tree.add_note(text)
+            with self.tree.lock_for(self.fid):
+                self.mutable("notes").add(note)
 
     def print(self, file=sys.stdout):
         """print individual in GEDCOM format"""
@@ -500,7 +651,7 @@ class Indi:
                 file.write(cont("2 PAGE " + quote))
 
 
-class Fam:
+class Fam(LazySets):
     """GEDCOM family class
     :param husb: husbant fid
     :param wife: wife fid
@@ -508,67 +659,87 @@ class Fam:
     :param num: a GEDCOM identifier
     """
 
-    counter = 0
+    __slots__ = (
+        "num",
+        "husb_fid",
+        "wife_fid",
+        "tree",
+        "husb_num",
+        "wife_num",
+        "fid",
+        "sealing_spouse",
+        "_facts",
+        "_chil_fid",
+        "_chil_num",
+        "_notes",
+        "_sources",
+    )
+    facts = LazySet()
+    chil_fid = LazySet()
+    chil_num = LazySet()
+    notes = LazySet()
+    sources = LazySet()
 
     def __init__(self, husb=None, wife=None, tree=None, num=None):
         if num:
             self.num = num
         else:
-            Fam.counter += 1
-            self.num = Fam.counter
+            self.num = next(tree.fam_nums)
         self.husb_fid = husb if husb else None
         self.wife_fid = wife if wife else None
         self.tree = tree
         self.husb_num = self.wife_num = self.fid = None
-        self.facts = set()
         self.sealing_spouse = None
-        self.chil_fid = set()
-        self.chil_num = set()
-        self.notes = set()
-        self.sources = set()
+        self._facts = self._chil_fid = self._chil_num = None
+        self._notes = self._sources = None
 
     def add_child(self, child):
         """add a child fid to the family"""
         if child not in self.chil_fid:
-            self.chil_fid.add(child)
+            self.mutable("chil_fid").add(child)
+
+    @property
+    def key(self):
+        """the key of the family in the tree"""
+        return (self.husb_fid, self.wife_fid)
 
     def add_marriage(self, fid):
         """retrieve and add marriage information
         :param fid: the marriage fid
         """
-        if not self.fid:
+        with self.tree.lock_for(self.key):
+            if self.fid:
+                return
             self.fid = fid
-            url = "/platform/tree/couple-relationships/%s" % self.fid
-            data = self.tree.fs.get_url(url)
-            if data:
-                if "facts" in data["relationships"][0]:
+        url = "/platform/tree/couple-relationships/%s" % self.fid
+        data = self.tree.fs.get_url(url)
+        if data:
+            if "facts" in data["relationships"][0]:
+                with self.tree.lock_for(self.key):
                     for x in data["relationships"][0]["facts"]:
-                        self.facts.add(Fact(x, self.tree))
-                if "sources" in data["relationships"][0]:
-                    quotes = dict()
-                    for x in data["relationships"][0]["sources"]:
-                        quotes[x["descriptionId"]] = (
-                            x["attribution"]["changeMessage"]
-                            if "changeMessage" in x["attribution"]
-                            else None
-                        )
-                    new_sources = quotes.keys() - self.tree.sources.keys()
-                    if new_sources:
-                        sources = self.tree.fs.get_url(
-                            "/platform/tree/couple-relationships/%s/sources" % self.fid
-                        )
-                        for source in sources["sourceDescriptions"]:
-                            if (
-                                source["id"] in new_sources
-                                and source["id"] not in self.tree.sources
-                            ):
-                                self.tree.sources[source["id"]] = Source(
-                                    source, self.tree
-                                )
-                    for source_fid in quotes:
-                        self.sources.add(
-                            (self.tree.sources[source_fid], quotes[source_fid])
-                        )
+                        self.mutable("facts").add(Fact(x, self.tree))
+            if "sources" in data["relationships"][0]:
+                quotes = dict()
+                for x in data["relationships"][0]["sources"]:
+                    quotes[x["descriptionId"]] = (
+                        x["attribution"]["changeMessage"]
+                        if "changeMessage" in x["attribution"]
+                        else None
+                    )
+                new_sources = [x for x in quotes if x not in self.tree.sources]
+                if new_sources:
+                    sources = self.tree.fs.get_url(
+                        "/platform/tree/couple-relationships/%s/sources" % self.fid
+                    )
+                    for source in sources["sourceDescriptions"]:
+                        if source["id"] in new_sources:
+                            self.tree.add_source(source)
+                links = [
+                    (self.tree.sources[source_fid], quotes[source_fid])
+                    for source_fid in quotes
+                ]
+                with self.tree.lock_for(self.key):
+                    self.mutable("sources").update(links)
 
     def get_notes(self):
         """retrieve marriage notes"""
@@ -577,10 +748,13 @@ class Fam:
                 "/platform/tree/couple-relationships/%s/notes" % self.fid
             )
             if notes:
-                for n in notes["relationships"][0]["notes"]:
-                    text_note = "=== %s ===\n" % n["subject"] if "subject" in n else ""
-                    text_note += n["text"] + "\n" if "text" in n else ""
-                    self.notes.add(Note(text_note, self.tree))
+                with self.tree.lock_for(self.key):
+                    for n in notes["relationships"][0]["notes"]:
+                        text_note = (
+                            "=== %s ===\n" % n["subject"] if "subject" in n else ""
+                        )
+                        text_note += n["text"] + "\n" if "text" in n else ""
+                        self.mutable("notes").add(self.tree.add_note(text_note))
 
     def get_contributors(self):
         """retrieve contributors"""
@@ -599,11 +773,9 @@ class Fam:
                     self.tree.fs._("Contributors"),
                     "\n".join(sorted(temp)),
                 )
-                for n in self.tree.notes:
-                    if n.text == text:
-                        self.notes.add(n)
-                        return
-                self.notes.add(Note(text, self.tree))
+                note = self.tree.add_note(text)
+                with self.tree.lock_for(self.key):
+                    self.mutable("notes").add(note)
 
     def print(self, file=sys.stdout):
         """print family information in GEDCOM format"""
@@ -632,20 +804,178 @@ class Fam:
 class Tree:
     """family tree class
     :param fs: a Session object
+    :param storage: directory of a temporary database storing the individuals,
+                    families, sources and notes, they are kept in memory if None
+    :param cache_size: number of objects of each kind kept in memory with storage
+    :param spool: a Spool object, or another object with its write method,
+                  the records are written to once complete
     """
 
-    def __init__(self, fs=None):
+    def __init__(self, fs=None, storage=None, cache_size=10000, spool=None):
         self.fs = fs
-        self.indi = dict()
-        self.fam = dict()
-        self.notes = list()
-        self.sources = dict()
+        self.spool = spool
+        self.database = None
+        self.snapshot = None
+        if storage:
+            self.database = Database(self, storage, cache_size)
+            self.indi = self.database.dict("indi", "num")
+            self.fam = self.database.dict("fam", "num")
+            self.notes = self.database.list("notes")
+            self.note_index = self.database.dict("note_index")
+            self.sources = self.database.dict("sources", "num")
+            # interned values would stay in memory for the whole crawl
+            self.strings = None
+        else:
+            self.indi = dict()
+            self.fam = dict()
+            self.notes = list()
+            self.note_index = dict()
+            self.sources = dict()
+            self.strings = dict()
         self.places = dict()
+        self.graph = Graph()
+        # GEDCOM identifiers, next() on a count is atomic
+        self.indi_nums = itertools.count(1)
+        self.fam_nums = itertools.count(1)
+        self.note_nums = itertools.count(1)
+        self.source_nums = itertools.count(1)
+        self.note_lock = threading.Lock()
+        self.locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
         self.display_name = self.lang = None
         if fs:
             self.display_name = fs.display_name
             self.lang = babelfish.Language.fromalpha2(fs.lang).name
 
+    def intern(self, value):
+        """return the copy of value stored in the tree, storing it if new
+        Repeated values like surnames, places, dates and fact types are then
+        shared by every object using them.
+        :param value: a string or another hashable value, None is kept
+        """
+        if value is None or self.strings is None:
+            return value
+        return self.strings.setdefault(value, value)
+
+    def lock_for(self, key):
+        """return the lock guarding the object of the tree with this key
+        Worker threads modify an individual (key: fid), a family (key: Fam.key)
+        or a source (key: fid) only while holding its lock, and never take
+        another of these locks while holding one. The tree structures
+        themselves (indi, fam, graph, places) are only modified by the thread
+        running the crawl.
+        """
+        return self.locks[hash(key) % LOCK_STRIPES]
+
+    def edit(self, records, key):
+        """return a context manager giving the object of records (indi, fam or
+        sources) with this key, to modify it in its block
+        With storage, the object is pinned in memory during the block.
+        """
+        if isinstance(records, DiskDict):
+            return records.pinned(key)
+        return nullcontext(records[key])
+
+    def modify(self, records, key, function, *args):
+        """return function(obj, *args), obj being the object of records with
+        this key, modified by function (see edit)
+        """
+        with self.edit(records, key) as obj:
+            return function(obj, *args)
+
+    def add_source(self, data):
+        """return the source of the tree with this FS data, adding it if new
+        :param data: FS source description
+        """
+        with self.lock_for(data["id"]):
+            if data["id"] not in self.sources:
+                self.sources[data["id"]] = Source(data, self)
+                if self.spool:
+                    self.spool.write("sour", self.sources[data["id"]])
+            return self.sources[data["id"]]
+
+    def add_note(self, text):
+        """return the note of the tree with this text, adding it if new
+        :param text: the note content
+        """
+        text = text.strip()
+        with self.note_lock:
+            if text not in self.note_index:
+                self.note_index[text] = Note(text, self)
+                if self.spool:
+                    self.spool.write("note", self.note_index[text])
+            return self.note_index[text]
+
+    def merge_notes(self):
+        """number the notes read from GEDCOM files by text, keeping one
+        note per text in the tree
+        """
+        self.note_index = dict()
+        for note in sorted(self.notes, key=lambda x: x.text):
+            if note.text in self.note_index:
+                note.num = self.note_index[note.text].num
+            else:
+                note.num = len(self.note_index) + 1
+                self.note_index[note.text] = note
+        self.notes = list(self.note_index.values())
+
+    def persistent_id(self, obj):
+        """return the reference saved in the database for an object stored
+        apart, or None to save the object itself
+        """
+        if obj is self:
+            return ("tree",)
+        if isinstance(obj, Fam):
+            return ("fam", obj.husb_fid, obj.wife_fid)
+        if isinstance(obj, Source) and obj.fid:
+            return ("source", obj.fid)
+        if isinstance(obj, Note):
+            return ("note", obj.text)
+        return None
+
+    def persistent_load(self, pid):
+        """return the object referenced in the database"""
+        if pid[0] == "tree":
+            return self
+        if pid[0] == "fam":
+            return self.fam[(pid[1], pid[2])]
+        if pid[0] == "source":
+            return self.sources[pid[1]]
+        if pid[0] == "note":
+            return self.note_index[pid[1]]
+        raise pickle.UnpicklingError("unknown reference %r" % (pid,))
+
+    def save_snapshot(self, filename):
+        """save the tree to a binary snapshot file, reloaded with
+        load_snapshot much faster than a GEDCOM file and with all its data
+        :param filename: the snapshot file name
+        """
+        snapshot.save(self, filename)
+
+    def load_snapshot(self, filename, lazy=False):
+        """load a snapshot file saved by save_snapshot into the tree
+        :param filename: the snapshot file name
+        :param lazy: map the file in memory and load the individuals, families
+                     and sources on first access, the file is then used until
+                     close()
+        The sources and notes loaded are written to the spool, if any, the
+        individuals and families are by finalize_indi and finalize_fam.
+        """
+        snapshot.load(self, filename, lazy)
+        if self.spool:
+            for fid in self.sources:
+                self.spool.write("sour", self.sources[fid])
+            for note in self.notes:
+                self.spool.write("note", note)
+
+    def close(self):
+        """delete the database of the tree and unmap its snapshot, if any"""
+        if self.database:
+            self.database.close()
+            self.database = None
+        if self.snapshot:
+            self.snapshot.close()
+            self.snapshot = None
+
     def add_indis(self, fids):
         """add individuals to the family tree
         :param fids: an iterable of fid
@@ -656,12 +986,22 @@ class Tree:
             for person in data["persons"]:
                 self.indi[person["id"]] = Indi(person["id"], self)
                 futures.add(
-                    loop.run_in_executor(None, self.indi[person["id"]].add_data, person)
+                    loop.run_in_executor(
+                        self.fs.executor,
+                        self.modify,
+                        self.indi,
+                        person["id"],
+                        Indi.add_data,
+                        person,
+                    )
                 )
             for future in futures:
                 await future
 
         new_fids = [fid for fid in fids if fid and fid not in self.indi]
+        progress = self.fs.progress
+        if progress:
+            progress.expect(len(new_fids))
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         while new_fids:
@@ -672,9 +1012,11 @@ class Tree:
                 if "places" in data:
                     for place in data["places"]:
                         if place["id"] not in self.places:
-                            self.places[place["id"]] = (
-                                str(place["latitude"]),
-                                str(place["longitude"]),
+                            self.places[place["id"]] = self.intern(
+                                (
+                                    self.intern(str(place["latitude"])),
+                                    self.intern(str(place["longitude"])),
+                                )
                             )
                 loop.run_until_complete(add_datas(loop, data))
                 if "childAndParentsRelationships" in data:
@@ -686,26 +1028,20 @@ class Tree:
                             rel["parent2"]["resourceId"] if "parent2" in rel else None
                         )
                         child = rel["child"]["resourceId"] if "child" in rel else None
-                        if child in self.indi:
-                            self.indi[child].parents.add((father, mother))
-                        if father in self.indi:
-                            self.indi[father].children.add((father, mother, child))
-                        if mother in self.indi:
-                            self.indi[mother].children.add((father, mother, child))
+                        self.graph.add_trio(
+                            father, mother, child, self.indi.__contains__
+                        )
                 if "relationships" in data:
                     for rel in data["relationships"]:
                         if rel["type"] == "http://gedcomx.org/Couple":
-                            person1 = rel["person1"]["resourceId"]
-                            person2 = rel["person2"]["resourceId"]
-                            relfid = rel["id"]
-                            if person1 in self.indi:
-                                self.indi[person1].spouses.add(
-                                    (person1, person2, relfid)
-                                )
-                            if person2 in self.indi:
-                                self.indi[person2].spouses.add(
-                                    (person1, person2, relfid)
-                                )
+                            self.graph.add_couple(
+                                rel["person1"]["resourceId"],
+                                rel["person2"]["resourceId"],
+                                rel["id"],
+                                self.indi.__contains__,
+                            )
+            if progress:
+                progress.advance(len(new_fids[:MAX_PERSONS]))
             new_fids = new_fids[MAX_PERSONS:]
 
     def add_fam(self, father, mother):
@@ -723,35 +1059,33 @@ class Tree:
         :param child: the child fid or None
         """
         if father in self.indi:
-            self.indi[father].add_fams((father, mother))
+            self.modify(self.indi, father, Indi.add_fams, (father, mother))
         if mother in self.indi:
-            self.indi[mother].add_fams((father, mother))
+            self.modify(self.indi, mother, Indi.add_fams, (father, mother))
         if child in self.indi and (father in self.indi or mother in self.indi):
-            self.indi[child].add_famc((father, mother))
+            self.modify(self.indi, child, Indi.add_famc, (father, mother))
             self.add_fam(father, mother)
-            self.fam[(father, mother)].add_child(child)
+            self.modify(self.fam, (father, mother), Fam.add_child, child)
 
     def add_parents(self, fids):
         """add parents relationships
         :param fids: a set of fids
         """
         parents = set()
-        for fid in fids & self.indi.keys():
-            for couple in self.indi[fid].parents:
-                parents |= set(couple)
+        for father, mother, _ in self.graph.parents(fids & self.indi.keys()):
+            parents |= {father, mother}
         if parents:
             self.add_indis(parents)
-        for fid in fids & self.indi.keys():
-            for father, mother in self.indi[fid].parents:
-                if (
-                    mother in self.indi
-                    and father in self.indi
-                    or not father
-                    and mother in self.indi
-                    or not mother
-                    and father in self.indi
-                ):
-                    self.add_trio(father, mother, fid)
+        for father, mother, fid in self.graph.parents(fids & self.indi.keys()):
+            if (
+                mother in self.indi
+                and father in self.indi
+                or not father
+                and mother in self.indi
+                or not mother
+                and father in self.indi
+            ):
+                self.add_trio(father, mother, fid)
         return set(filter(None, parents))
 
     def add_spouses(self, fids):
@@ -765,15 +1099,18 @@ class Tree:
                 if (father, mother) in self.fam:
                     futures.add(
                         loop.run_in_executor(
-                            None, self.fam[(father, mother)].add_marriage, relfid
+                            self.fs.executor,
+                            self.modify,
+                            self.fam,
+                            (father, mother),
+                            Fam.add_marriage,
+                            relfid,
                         )
                     )
             for future in futures:
                 await future
 
-        rels = set()
-        for fid in fids & self.indi.keys():
-            rels |= self.indi[fid].spouses
+        rels = self.graph.spouses(fids & self.indi.keys())
         loop = asyncio.get_event_loop()
         if rels:
             self.add_indis(
@@ -781,8 +1118,8 @@ class Tree:
             )
             for father, mother, _ in rels:
                 if father in self.indi and mother in self.indi:
-                    self.indi[father].add_fams((father, mother))
-                    self.indi[mother].add_fams((father, mother))
+                    self.modify(self.indi, father, Indi.add_fams, (father, mother))
+                    self.modify(self.indi, mother, Indi.add_fams, (father, mother))
                     self.add_fam(father, mother)
             loop.run_until_complete(add(loop, rels))
 
@@ -790,9 +1127,7 @@ class Tree:
         """add children relationships
         :param fids: a set of fid
         """
-        rels = set()
-        for fid in fids & self.indi.keys():
-            rels |= self.indi[fid].children if fid in self.indi else set()
+        rels = self.graph.children(fids & self.indi.keys())
         children = set()
         if rels:
             self.add_indis(set.union(*(set(rel) for rel in rels)))
@@ -814,34 +1149,52 @@ class Tree:
         :param fid: an individual fid
         """
         if fid in self.indi:
-            ret, famc = self.indi[fid].get_ordinances()
-            if famc and famc in self.fam:
-                self.indi[fid].sealing_child.famc = self.fam[famc]
+            with self.edit(self.indi, fid) as indi:
+                ret, famc = indi.get_ordinances()
+                if famc and famc in self.fam:
+                    with self.lock_for(fid):
+                        indi.sealing_child.famc = self.fam[famc]
             for o in ret:
                 spouse_id = o["relationships"]["spouseId"]
-                if (fid, spouse_id) in self.fam:
-                    self.fam[fid, spouse_id].sealing_spouse = Ordinance(o)
-                elif (spouse_id, fid) in self.fam:
-                    self.fam[spouse_id, fid].sealing_spouse = Ordinance(o)
+                for key in ((fid, spouse_id), (spouse_id, fid)):
+                    if key in self.fam:
+                        with self.lock_for(key), self.edit(self.fam, key) as fam:
+                            fam.sealing_spouse = Ordinance(o)
+                        break
+
+    def reset_fam_num(self, fam):
+        """reset the GEDCOM identifiers of the members of a family"""
+        husb, wife = fam.key
+        fam.husb_num = self.indi[husb].num if husb else None
+        fam.wife_num = self.indi[wife].num if wife else None
+        fam.chil_num = set(self.indi[chil].num for chil in fam.chil_fid)
+
+    def reset_indi_num(self, indi):
+        """reset the GEDCOM identifiers of the families of an individual"""
+        indi.famc_num = set(self.fam[famc].num for famc in indi.famc_fid)
+        indi.fams_num = set(self.fam[fams].num for fams in indi.fams_fid)
 
     def reset_num(self):
         """reset all GEDCOM identifiers"""
-        for husb, wife in self.fam:
-            self.fam[(husb, wife)].husb_num = self.indi[husb].num if husb else None
-            self.fam[(husb, wife)].wife_num = self.indi[wife].num if wife else None
-            self.fam[(husb, wife)].chil_num = set(
-                self.indi[chil].num for chil in self.fam[(husb, wife)].chil_fid
-            )
+        for key in self.fam:
+            self.modify(self.fam, key, self.reset_fam_num)
         for fid in self.indi:
-            self.indi[fid].famc_num = set(
-                self.fam[(husb, wife)].num for husb, wife in self.indi[fid].famc_fid
-            )
-            self.indi[fid].fams_num = set(
-                self.fam[(husb, wife)].num for husb, wife in self.indi[fid].fams_fid
-            )
-
-    def print(self, file=sys.stdout):
-        """print family tree in GEDCOM format"""
+            self.modify(self.indi, fid, self.reset_indi_num)
+
+    def finalize_indi(self, fid):
+        """write a complete individual to the spool"""
+        with self.edit(self.indi, fid) as indi:
+            self.reset_indi_num(indi)
+            self.spool.write("indi", indi)
+
+    def finalize_fam(self, key):
+        """write a complete family to the spool"""
+        with self.edit(self.fam, key) as fam:
+            self.reset_fam_num(fam)
+            self.spool.write("fam", fam)
+
+    def print_header(self, file=sys.stdout):
+        """print the GEDCOM header"""
         file.write("0 HEAD\n")
         file.write("1 CHAR UTF-8\n")
         file.write("1 GEDC\n")
@@ -857,17 +1210,61 @@ class Tree:
         file.write("1 NAME %s\n" % self.display_name)
         file.write("1 LANG %s\n" % self.lang)
 
-        for fid in sorted(self.indi, key=lambda x: self.indi.__getitem__(x).num):
-            self.indi[fid].print(file)
-        for husb, wife in sorted(self.fam, key=lambda x: self.fam.__getitem__(x).num):
-            self.fam[(husb, wife)].print(file)
-        sources = sorted(self.sources.values(), key=lambda x: x.num)
-        for s in sources:
-            s.print(file)
-        notes = sorted(self.notes, key=lambda x: x.num)
-        for i, n in enumerate(notes):
-            if i > 0:
-                if n.num == notes[i - 1].num:
-                    continue
-            n.print(file)
-        file.write("0 TRLR\n")
+    def records(self):
+        """iterate over the records of the tree in GEDCOM file order"""
+        for records in (self.indi, self.fam, self.sources):
+            if isinstance(records, DiskDict):
+                yield from records.ordered_values()
+            else:
+                yield from sorted(records.values(), key=lambda x: x.num)
+        yield from sorted(self.notes, key=lambda x: x.num)
+
+    def print(self, file=sys.stdout, buffer_size=BUFFER_SIZE, processes=1):
+        """print family tree in GEDCOM format
+        :param file: a text or binary file object
+        :param buffer_size: characters collected before a write to the file
+        :param processes: number of processes rendering the records, at most
+                          one per CPU; they are forked so they inherit the
+                          records instead of receiving them
+        """
+        writer = GedcomWriter(file, buffer_size)
+        self.print_header(writer)
+        processes = min(processes, os.cpu_count() or 1)
+        if processes > 1 and not self.database and "fork" in get_all_start_methods():
+            # the forked processes only render records, they never take the
+            # locks held by the threads of this process
+            records = list(self.records())
+            chunks = [
+                (start, start + PRINT_CHUNK)
+                for start in range(0, len(records), PRINT_CHUNK)
+            ]
+            with get_context("fork").Pool(processes, _inherit, (records,)) as pool:
+                for text in pool.imap(_render, chunks):
+                    writer.write(text)
+                    writer.end_record()
+        else:
+            for record in self.records():
+                record.print(writer)
+                writer.end_record()
+        writer.write("0 TRLR\n")
+        writer.flush()
+
+
+# records of the tree being printed, in the processes rendering them only
+_records = None
+
+
+def _inherit(records):
+    """initialize a process rendering records"""
+    global _records
+    _records = records
+
+
+def _render(chunk):
+    """return the GEDCOM text of a chunk of the records
+    :param chunk: (start, end) indexes
+    """
+    text = io.StringIO()
+    for record in _records[chunk[0] : chunk[1]]:
+        record.print(text)
+    return text.getvalue()
@@ -0,0 +1,37 @@
+# global imports
+import io
+
+# characters collected before a write to the file
+BUFFER_SIZE = 1 << 20
+
+
+class GedcomWriter:
+    """Collect the many small writes of a GEDCOM export in blocks
+    The print methods of the records write to it like to a file: the text
+    goes to an in-memory buffer, written to the file in one call once it
+    holds buffer_size characters at the end of a record. A binary file gets
+    the text encoded in UTF-8.
+    :param file: a text or binary file object
+    :param buffer_size: characters collected before writing them
+    """
+
+    def __init__(self, file, buffer_size=BUFFER_SIZE):
+        self.file = file
+        self.buffer_size = buffer_size
+        self.binary = isinstance(file, (io.RawIOBase, io.BufferedIOBase))
+        self.buffer = io.StringIO()
+        # the print methods call write for every line
+        self.write = self.buffer.write
+
+    def end_record(self):
+        """write the buffer to the file if it is full"""
+        if self.buffer.tell() >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """write the buffered text to the file"""
+        text = self.buffer.getvalue()
+        if text:
+            self.file.write(text.encode("utf-8") if self.binary else text)
+            self.buffer.seek(0)
+            self.buffer.truncate()
@@ -9,9 +9,22 @@ import getpass
 import asyncio
 import argparse
 # local imports
-from getmyancestors.classes.tree import Tree
+from getmyancestors.classes.tree import Fam, Indi, Tree
 from getmyancestors.classes.session import Session
 from getmyancestors.classes.gedcom import Gedcom
+from getmyancestors.classes.spool import Spool, Tee
+from getmyancestors.classes.export import (
+    JsonLines,
+    has_pyarrow,
+    write_arrow,
+    write_outputs,
+    write_sqlite,
+)
+from getmyancestors.classes.snapshot import is_snapshot
+from getmyancestors.classes import compression
+from getmyancestors.classes.profiler import Profiler
+from getmyancestors.classes.progress import Progress
+from getmyancestors.classes import diagnostics
 
 def main():
     parser = argparse.ArgumentParser(
@@ -85,6 +98,26 @@ def main():
         default=60,
         help="Timeout in seconds [60]",
     )
+    parser.add_argument(
+        "--concurrency",
+        metavar="<INT>",
+        type=int,
+        default=8,
+        help="Initial number of requests in flight, tuned automatically [8]",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        metavar="<INT>",
+        type=int,
+        default=32,
+        help="Maximum number of requests in flight [32]",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        default=False,
+        help="Duplicate requests slower than the 95th percentile of latency [False]",
+    )
     parser.add_argument(
         "--show-password",
         action="store_true",
@@ -101,9 +134,31 @@ def main():
         "-o",
         "--outfile",
         metavar="<FILE>",
-        type=argparse.FileType("w", encoding="UTF-8"),
+        type=compression.FileType("w", encoding="UTF-8"),
         default=sys.stdout,
-        help="output GEDCOM file [stdout]",
+        help="output GEDCOM file, compressed if it ends with .gz, .bz2, .xz "
+        "or .zst [stdout]",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=("gzip", "bz2", "xz", "zstd"),
+        help="compress the output GEDCOM file, whatever its name",
+    )
+    parser.add_argument(
+        "--buffer-size",
+        metavar="<INT>",
+        type=int,
+        default=1 << 20,
+        help="Number of characters collected before a write to the output file "
+        "[1048576]",
+    )
+    parser.add_argument(
+        "--processes",
+        metavar="<INT>",
+        type=int,
+        default=1,
+        help="Number of processes rendering the GEDCOM records, "
+        "ignored with --storage and --spool [1]",
     )
     parser.add_argument(
         "-l",
@@ -113,6 +168,85 @@ def main():
         default=False,
         help="output log file [stderr]",
     )
+    parser.add_argument(
+        "--metrics",
+        metavar="<FILE>",
+        type=argparse.FileType("w", encoding="UTF-8"),
+        help="output request metrics per endpoint, in Prometheus text format "
+        "if the file name ends with .prom, else in JSON",
+    )
+    parser.add_argument(
+        "--trace-http",
+        metavar="<FILE>",
+        type=argparse.FileType("w", encoding="UTF-8"),
+        help="output a trace of every HTTP request",
+    )
+    parser.add_argument(
+        "--trace-format",
+        choices=("har", "chrome"),
+        default="har",
+        help="format of the HTTP trace: HAR or Chrome trace JSON [har]",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="<DIR>",
+        type=str,
+        help="output a CPU profile and an allocation summary of each phase",
+    )
+    parser.add_argument(
+        "--progress-json",
+        action="store_true",
+        default=False,
+        help="Write progress as newline-delimited JSON events on stderr [False]",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=("text", "json"),
+        default="text",
+        help="format of the log lines: text or JSON with structured fields [text]",
+    )
+    parser.add_argument(
+        "--log-sample",
+        metavar="<FLOAT>",
+        type=float,
+        default=1.0,
+        help="Proportion of the requests logged in verbose mode, "
+        "warnings are always logged [1.0]",
+    )
+    parser.add_argument(
+        "--diagnostics-file",
+        metavar="<FILE>",
+        type=str,
+        help="append the diagnostics dumped on SIGUSR1 to this file [stderr]",
+    )
+    parser.add_argument(
+        "--storage",
+        metavar="<DIR>",
+        type=str,
+        help="keep the individuals, families, sources and notes in a temporary "
+        "database in this directory instead of memory",
+    )
+    parser.add_argument(
+        "--storage-cache",
+        metavar="<INT>",
+        type=int,
+        default=10000,
+        help="Number of objects of each kind kept in memory with --storage [10000]",
+    )
+    parser.add_argument(
+        "--spool",
+        metavar="<DIR>",
+        type=str,
+        help="write each record to spool files in this directory as soon as it "
+        "is complete, and build the output file from them at the end",
+    )
+    parser.add_argument(
+        "--jsonl",
+        metavar="<FILE>",
+        type=compression.FileType("a", encoding="UTF-8"),
+        help="append each person, family, source and note to this file as a "
+        "JSON line as soon as it is complete",
+    )
     parser.add_argument(
         "--client_id", metavar="<STR>", type=str, help="Use Specific Client ID"
     )
@@ -123,8 +257,37 @@ def main():
     parser.add_argument(
         "--resume-from",
         metavar="<FILE>",
-        type=argparse.FileType("r", encoding="UTF-8"),
-        help="Resume download from existing GEDCOM file (requires -i as reference point)",
+        type=compression.FileType("r", encoding="UTF-8"),
+        help="Resume download from existing GEDCOM file, possibly compressed, or "
+        "snapshot file (requires -i as reference point); only use snapshot files "
+        "you saved yourself",
+    )
+    parser.add_argument(
+        "--sqlite",
+        metavar="<FILE>",
+        type=str,
+        help="also write the tree to an indexed SQLite database",
+    )
+    parser.add_argument(
+        "--parquet",
+        metavar="<DIR>",
+        type=str,
+        help="also write the persons, facts and parent-child edges as Parquet "
+        "files in this directory (needs pyarrow)",
+    )
+    parser.add_argument(
+        "--arrow",
+        metavar="<DIR>",
+        type=str,
+        help="also write the persons, facts and parent-child edges as Arrow IPC stream "
+        "files in this directory (needs pyarrow)",
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="<FILE>",
+        type=str,
+        help="save the tree to a binary snapshot file, faster to reload than a "
+        "GEDCOM file and with all the FamilySearch data, for --resume-from",
     )
     # ================================================
 
@@ -135,12 +298,16 @@ def main():
     except SystemExit:
         parser.print_help(file=sys.stderr)
         sys.exit(2)
+    if (args.parquet or args.arrow) and not has_pyarrow():
+        parser.error("--parquet and --arrow need the pyarrow package")
         
     # Verificação de argumentos para --resume-from
     if args.resume_from and not args.individuals:
         print("Error: -i/--individuals is required when using --resume-from as reference point.", file=sys.stderr)
         sys.exit(2)
         
+    args.outfile = compression.compress(args.outfile, args.compression)
+
     if args.individuals:
         for fid in args.individuals:
             if not re.match(r"[A-Z0-9]{4}-[A-Z0-9]{3}", fid):
@@ -185,6 +352,8 @@ def main():
             
     # initialize a FamilySearch session and a family tree object
     print("Login to FamilySearch...", file=sys.stderr)
+    profiler = Profiler(args.profile)
+    profiler.start("login")
     fs = Session(
         args.username,
         args.password,
@@ -192,29 +361,61 @@ def main():
         args.redirect_uri,
         args.verbose,
         args.logfile,
-        args.timeout
+        args.timeout,
+        concurrency=args.concurrency,
+        max_concurrency=args.max_concurrency,
+        hedge=args.hedge,
+        trace=bool(args.trace_http),
+        log_format=args.log_format,
+        log_sample=args.log_sample,
     )
     if not fs.logged:
         sys.exit(2)
+    fs.executor = profiler.executor(fs.executor)
     _ = fs._
 
     # === MODIFICAÇÃO: Lógica para --resume-from ===
-    tree = Tree(fs) # Criar a árvore associada à sessão
+    spool = Spool(args.spool) if args.spool else None
+    sinks = [sink for sink in (spool, args.jsonl and JsonLines(args.jsonl)) if sink]
+    tree = Tree(  # Criar a árvore associada à sessão
+        fs,
+        args.storage,
+        args.storage_cache,
+        Tee(sinks) if len(sinks) > 1 else (sinks[0] if sinks else None),
+    )
+    progress = Progress(fs, tree, json_events=args.progress_json)
+    fs.progress = progress
+    diagnostics.install(fs, tree, args.diagnostics_file)
+
+    def start_phase(name, text=None):
+        """set the current phase of the crawl and report it"""
+        if name != fs.phase:
+            fs.phase = name
+            profiler.start(name)
+        progress.phase(name, text)
     
     if args.resume_from:
         print(_("Resuming from existing GEDCOM file with reference point..."), file=sys.stderr)
         print(_("Reference individual(s): %s") % ", ".join(args.individuals), file=sys.stderr)
         print(_("Resume start offset (descend): %s, Resume generations (ascend): %s") % (args.descend, args.ascend), file=sys.stderr)
         
-        # 1. Carregar o arquivo GEDCOM existente
-        ged = Gedcom(args.resume_from, tree)
-        
-        # 2. Coletar os FIDs dos indivíduos carregados
-        fids_from_ged = set()
-        for num in ged.indi:
-            if ged.indi[num].fid:
-                fids_from_ged.add(ged.indi[num].fid)
-                
+        if is_snapshot(args.resume_from.name):
+            # a snapshot holds the complete FamilySearch data of the tree
+            tree.load_snapshot(args.resume_from.name)
+            fids_from_ged = set(tree.indi)
+        else:
+            # 1. Carregar o arquivo GEDCOM existente
+            # only its fids are used, the individuals are downloaded again:
+            # it is read into a tree of its own, so that its notes and
+            # sources, numbered as in the file, do not end up in the output
+            ged = Gedcom(args.resume_from, Tree())
+
+            # 2. Coletar os FIDs dos indivíduos carregados
+            fids_from_ged = set()
+            for num in ged.indi:
+                if ged.indi[num].fid:
+                    fids_from_ged.add(ged.indi[num].fid)
+
         print(_("Loaded %s individuals from GEDCOM file.") % len(fids_from_ged), file=sys.stderr)
         
         if not fids_from_ged:
@@ -222,7 +423,10 @@ def main():
             sys.exit(1)
             
         # 3. Buscar dados completos desses indivíduos no FamilySearch
-        print(_("Fetching complete data for individuals from FamilySearch..."), file=sys.stderr)
+        start_phase(
+            "resume", _("Fetching complete data for individuals from FamilySearch...")
+        )
+        # individuals of a snapshot are already complete and skipped
         tree.add_indis(fids_from_ged)
         
         # 4. Identificar os verdadeiros pontos de partida para continuar a busca
@@ -306,33 +510,35 @@ def main():
         print(_("Resumed with %s individuals to start from.") % len(todo), file=sys.stderr)
         
         # 6. Baixar as gerações solicitadas
+        start_phase("ancestors")
         done = set()
         for i in range(args.ascend):
             if not todo:
                 break
             done |= todo
-            print(
+            start_phase(
+                "ancestors",
                 _("Downloading %s. of generations of ancestors (from resume point)...") % (i + 1),
-                file=sys.stderr,
             )
             todo = tree.add_parents(todo) - done
             
     else:
         # Comportamento original para download inicial
         initial_fids = args.individuals if args.individuals else [fs.fid]
-        print(_("Downloading starting individuals..."), file=sys.stderr)
+        start_phase("start", _("Downloading starting individuals..."))
         tree.add_indis(initial_fids)
         todo = set(tree.indi.keys())
         
         # download ancestors (comportamento original)
+        start_phase("ancestors")
         done = set()
         for i in range(args.ascend):
             if not todo:
                 break
             done |= todo
-            print(
+            start_phase(
+                "ancestors",
                 _("Downloading %s. of generations of ancestors...") % (i + 1),
-                file=sys.stderr,
             )
             todo = tree.add_parents(todo) - done
     # ================================================
@@ -341,15 +547,16 @@ def main():
     # Nota: Esta parte pode precisar de ajuste se for para suportar descendência na retomada
     # Por enquanto, mantém o comportamento original somente no modo normal
     if not args.resume_from: # Só baixar descendentes no modo normal
+        start_phase("descendants")
         todo_desc = set(tree.indi.keys())
         done_desc = set()
         for i in range(args.descend):
             if not todo_desc:
                 break
             done_desc |= todo_desc
-            print(
+            start_phase(
+                "descendants",
                 _("Downloading %s. of generations of descendants...") % (i + 1),
-                file=sys.stderr,
             )
             todo_desc = tree.add_children(todo_desc) - done_desc
     else:
@@ -359,27 +566,72 @@ def main():
         
     # download spouses
     if args.marriage:
-        print(_("Downloading spouses and marriage information..."), file=sys.stderr)
+        start_phase("spouses", _("Downloading spouses and marriage information..."))
         todo_spouses = set(tree.indi.keys())
         tree.add_spouses(todo_spouses)
         
     # download ordinances, notes and contributors
     async def download_stuff(loop):
         futures = set()
-        for fid, indi in tree.indi.items():
-            futures.add(loop.run_in_executor(None, indi.get_notes))
+        indi_futures = dict()
+        fam_futures = dict()
+        for fid in tree.indi:
+            indi_futures[fid] = [
+                loop.run_in_executor(
+                    fs.executor, tree.modify, tree.indi, fid, Indi.get_notes
+                )
+            ]
             if args.get_ordinances:
-                futures.add(loop.run_in_executor(None, tree.add_ordinances, fid))
+                indi_futures[fid].append(
+                    loop.run_in_executor(fs.executor, tree.add_ordinances, fid)
+                )
             if args.get_contributors:
-                futures.add(loop.run_in_executor(None, indi.get_contributors))
-        for fam in tree.fam.values():
-            futures.add(loop.run_in_executor(None, fam.get_notes))
+                indi_futures[fid].append(
+                    loop.run_in_executor(
+                        fs.executor, tree.modify, tree.indi, fid, Indi.get_contributors
+                    )
+                )
+            futures.update(indi_futures[fid])
+        for key in tree.fam:
+            fam_futures[key] = [
+                loop.run_in_executor(
+                    fs.executor, tree.modify, tree.fam, key, Fam.get_notes
+                )
+            ]
             if args.get_contributors:
-                futures.add(loop.run_in_executor(None, fam.get_contributors))
+                fam_futures[key].append(
+                    loop.run_in_executor(
+                        fs.executor, tree.modify, tree.fam, key, Fam.get_contributors
+                    )
+                )
+            futures.update(fam_futures[key])
+        progress.expect(len(futures))
+        for future in futures:
+            future.add_done_callback(lambda future: progress.advance())
+        if tree.spool:
+            # a record is complete once its own downloads are done, and the
+            # ordinances of the spouses for a family
+            async def finalize(finalizer, key, waits):
+                await asyncio.gather(*waits)
+                finalizer(key)
+
+            tasks = [
+                finalize(tree.finalize_indi, fid, waits)
+                for fid, waits in indi_futures.items()
+            ] + [
+                finalize(
+                    tree.finalize_fam,
+                    key,
+                    waits + indi_futures.get(key[0], []) + indi_futures.get(key[1], []),
+                )
+                for key, waits in fam_futures.items()
+            ]
+            await asyncio.gather(*tasks)
         for future in futures:
             await future
     loop = asyncio.get_event_loop()
-    print(
+    start_phase(
+        "enrichment",
         _("Downloading notes")
         + (
             (("," if args.get_contributors else _(" and")) + _(" ordinances"))
@@ -388,13 +640,36 @@ def main():
         )
         + (_(" and contributors") if args.get_contributors else "")
         + "...",
-        file=sys.stderr,
     )
     loop.run_until_complete(download_stuff(loop))
     
     # compute number for family relationships and print GEDCOM file
-    tree.reset_num()
-    tree.print(args.outfile)
+    if spool:
+        start_phase("print")
+        spool.assemble(tree, args.outfile, args.buffer_size)
+        spool.remove()
+    else:
+        start_phase("reset_num")
+        tree.reset_num()
+        start_phase("print")
+        tree.print(args.outfile, args.buffer_size, args.processes)
+    if args.outfile is not sys.stdout:
+        # writes the end of a compressed stream
+        args.outfile.close()
+    if args.jsonl:
+        args.jsonl.close()
+    outputs = list()
+    if args.sqlite:
+        outputs.append(("SQLite", lambda: write_sqlite(tree, args.sqlite)))
+    if args.parquet:
+        outputs.append(("Parquet", lambda: write_arrow(tree, args.parquet)))
+    if args.arrow:
+        outputs.append(("Arrow", lambda: write_arrow(tree, args.arrow, "arrow")))
+    if args.snapshot:
+        outputs.append(("snapshot", lambda: tree.save_snapshot(args.snapshot)))
+    failed = write_outputs(outputs)
+    profiler.stop()
+    progress.close()
     print(
         _(
             "Downloaded %s individuals, %s families, %s sources and %s notes "
@@ -410,6 +685,27 @@ def main():
         ),
         file=sys.stderr,
     )
+    tree.close()
+
+    def write_metrics():
+        fs.metrics.dump(
+            args.metrics,
+            "prometheus" if args.metrics.name.endswith(".prom") else "json",
+        )
+        args.metrics.close()
+
+    def write_trace():
+        fs.tracer.write(args.trace_http, args.trace_format)
+        args.trace_http.close()
+
+    outputs = list()
+    if args.metrics:
+        outputs.append(("metrics", write_metrics))
+    if args.trace_http:
+        outputs.append(("HTTP trace", write_trace))
+    failed += write_outputs(outputs)
+    if failed:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -10,6 +10,15 @@ import argparse
 # local imports
 from getmyancestors.classes.tree import Indi, Fam, Tree
 from getmyancestors.classes.gedcom import Gedcom
+from getmyancestors.classes.export import (
+    JsonLines,
+    has_pyarrow,
+    write_arrow,
+    write_outputs,
+    write_sqlite,
+)
+from getmyancestors.classes.profiler import Profiler
+from getmyancestors.classes import compression
 
 sys.path.append(os.path.dirname(sys.argv[0]))
 
@@ -25,17 +34,68 @@ def main():
             "-i",
             metavar="<FILE>",
             nargs="+",
-            type=argparse.FileType("r", encoding="UTF-8"),
+            type=compression.FileType("r", encoding="UTF-8"),
             default=[sys.stdin],
-            help="input GEDCOM files [stdin]",
+            help="input GEDCOM files, possibly compressed [stdin]",
         )
         parser.add_argument(
             "-o",
             metavar="<FILE>",
             nargs="?",
-            type=argparse.FileType("w", encoding="UTF-8"),
+            type=compression.FileType("w", encoding="UTF-8"),
             default=sys.stdout,
-            help="output GEDCOM files [stdout]",
+            help="output GEDCOM files, compressed if it ends with .gz, .bz2, "
+            ".xz or .zst [stdout]",
+        )
+        parser.add_argument(
+            "--jsonl",
+            metavar="<FILE>",
+            type=compression.FileType("w", encoding="UTF-8"),
+            help="also write each person, family, source and note as a JSON line",
+        )
+        parser.add_argument(
+            "--sqlite",
+            metavar="<FILE>",
+            type=str,
+            help="also write the merged tree to an indexed SQLite database",
+        )
+        parser.add_argument(
+            "--parquet",
+            metavar="<DIR>",
+            type=str,
+            help="also write the persons, facts and parent-child edges as Parquet "
+            "files in this directory (needs pyarrow)",
+        )
+        parser.add_argument(
+            "--arrow",
+            metavar="<DIR>",
+            type=str,
+            help="also write the persons, facts and parent-child edges as Arrow IPC "
+            "stream files in this directory (needs pyarrow)",
+        )
+        parser.add_argument(
+            "--snapshot",
+            metavar="<FILE>",
+            type=str,
+            help="save the merged tree to a binary snapshot file",
+        )
+        parser.add_argument(
+            "--compression",
+            choices=("gzip", "bz2", "xz", "zstd"),
+            help="compress the output GEDCOM file, whatever its name",
+        )
+        parser.add_argument(
+            "--processes",
+            metavar="<INT>",
+            type=int,
+            default=1,
+            help="number of processes rendering the GEDCOM records [1]",
+        )
+        parser.add_argument(
+            "--profile",
+            metavar="<DIR>",
+            type=str,
+            help="output a CPU profile and an allocation summary of each phase",
         )
     except TypeError:
         sys.stderr.write("Python >= 3.4 is required to run this script\n")
@@ -50,15 +110,22 @@ def main():
         print(e.code)
         parser.print_help()
         exit(2)
+    if (args.parquet or args.arrow) and not has_pyarrow():
+        parser.error("--parquet and --arrow need the pyarrow package")
+
+    args.o = compression.compress(args.o, args.compression)
 
     tree = Tree()
+    profiler = Profiler(args.profile)
 
     indi_counter = 0
     fam_counter = 0
 
     # read the GEDCOM data
     for file in args.i:
+        profiler.start("parse")
         ged = Gedcom(file, tree)
+        profiler.start("merge")
 
         # add information about individuals
         for num in ged.indi:
@@ -106,19 +173,36 @@ def main():
             tree.fam[(husb, wife)].sealing_spouse = ged.fam[num].sealing_spouse
 
     # merge notes by text
-    tree.notes = sorted(tree.notes, key=lambda x: x.text)
-    for i, n in enumerate(tree.notes):
-        if i == 0:
-            n.num = 1
-            continue
-        if n.text == tree.notes[i - 1].text:
-            n.num = tree.notes[i - 1].num
-        else:
-            n.num = tree.notes[i - 1].num + 1
+    tree.merge_notes()
 
     # compute number for family relationships and print GEDCOM file
+    profiler.start("reset_num")
     tree.reset_num()
-    tree.print(args.o)
+    profiler.start("print")
+    tree.print(args.o, processes=args.processes)
+    if args.o is not sys.stdout:
+        # writes the end of a compressed stream
+        args.o.close()
+
+    def write_jsonl():
+        JsonLines(args.jsonl).write_tree(tree)
+        args.jsonl.close()
+
+    outputs = list()
+    if args.jsonl:
+        outputs.append(("JSON Lines", write_jsonl))
+    if args.sqlite:
+        outputs.append(("SQLite", lambda: write_sqlite(tree, args.sqlite)))
+    if args.parquet:
+        outputs.append(("Parquet", lambda: write_arrow(tree, args.parquet)))
+    if args.arrow:
+        outputs.append(("Arrow", lambda: write_arrow(tree, args.arrow, "arrow")))
+    if args.snapshot:
+        outputs.append(("snapshot", lambda: tree.save_snapshot(args.snapshot)))
+    failed = write_outputs(outputs)
+    profiler.stop()
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+# coding: utf-8
+
+from __future__ import print_function
+
+# global imports
+import sys
+import json
+import argparse
+
+# local imports
+from getmyancestors.classes.tree import Tree
+from getmyancestors.classes.gedcom import Gedcom
+from getmyancestors.classes.snapshot import is_snapshot
+from getmyancestors.classes import compression
+
+
+def load(file):
+    """return the individuals of a GEDCOM or snapshot file, and the tree
+    to close once done with them
+    """
+    tree = Tree()
+    if is_snapshot(file.name):
+        tree.load_snapshot(file.name, lazy=True)
+        return [tree.indi[fid] for fid in tree.indi], tree
+    ged = Gedcom(file, tree)
+    return list(ged.indi.values()), tree
+
+
+def print_report(name, report, file=sys.stdout):
+    """print a report as text"""
+    file.write("=== %s ===\n" % name)
+    file.write(
+        "individuals: %s (M %s, F %s, U %s), birth years: %s, death years: %s\n"
+        % (
+            report["individuals"],
+            report["genders"]["M"],
+            report["genders"]["F"],
+            report["genders"]["U"],
+            report["birth_years"],
+            report["death_years"],
+        )
+    )
+    file.write("roots: %s\n" % ", ".join(report["roots"]))
+    file.write("\ngeneration  expected  ancestors  distinct  completeness  implex\n")
+    for row in report["generations"]:
+        file.write(
+            "%10d  %8d  %9d  %8d  %11.1f%%  %5.1f%%\n"
+            % (
+                row["generation"],
+                row["expected"],
+                row["slots"],
+                row["distinct"],
+                100 * row["completeness"],
+                100 * row["implex"],
+            )
+        )
+    file.write(
+        "distinct ancestors: %s, pedigree collapse: %.1f%%\n"
+        % (report["ancestors"], 100 * report["pedigree_collapse"])
+    )
+    lifespans = report["lifespans"]
+    if lifespans["known"]:
+        file.write(
+            "\nlifespans: %s known, mean %.1f, median %.1f years"
+            % (lifespans["known"], lifespans["mean"], lifespans["median"])
+        )
+        file.write(
+            " (%s)\n"
+            % ", ".join(
+                "%s %.1f" % item for item in sorted(lifespans["mean_by_gender"].items())
+            )
+        )
+        for row in lifespans["histogram"]:
+            file.write("%4d+  %s\n" % (row["from"], row["count"]))
+    if report["surnames"]:
+        file.write("\nsurnames:\n")
+        for surname, count in report["surnames"]:
+            file.write("%8d  %s\n" % (count, surname))
+    file.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Statistics of GEDCOM and snapshot files of FamilySearch trees",
+        add_help=False,
+        usage="treestats -i input1.ged input2.snap ... [options]",
+    )
+    parser.add_argument(
+        "-i",
+        metavar="<FILE>",
+        nargs="+",
+        type=compression.FileType("r", encoding="UTF-8"),
+        default=[sys.stdin],
+        help="input GEDCOM files, possibly compressed, or snapshot files [stdin]",
+    )
+    parser.add_argument(
+        "-r",
+        "--root",
+        metavar="<FID>",
+        nargs="+",
+        help="root individuals of the pedigree [the first individual of each file]",
+    )
+    parser.add_argument(
+        "--top",
+        metavar="<INT>",
+        type=int,
+        default=20,
+        help="number of surnames reported [20]",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        default=False,
+        help="print one JSON object per file rather than text [False]",
+    )
+
+    # extract arguments from the command line
+    try:
+        parser.error = parser.exit
+        args = parser.parse_args()
+    except SystemExit as e:
+        print(e.code)
+        parser.print_help()
+        exit(2)
+
+    try:
+        from getmyancestors.classes.stats import PersonTable
+    except ImportError:
+        sys.exit("the numpy package is required by treestats")
+
+    for file in args.i:
+        indis, tree = load(file)
+        report = PersonTable(indis).report(args.root, args.top)
+        tree.close()
+        if args.json:
+            print(json.dumps(dict(report, file=file.name), ensure_ascii=False))
+        else:
+            print_report(file.name, report)
+
+
+if __name__ == "__main__":
+    main()
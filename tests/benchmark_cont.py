@@ -0,0 +1,53 @@
+"""Time cont on the kinds of lines a tree prints
+usage: PYTHONPATH=. python tests/benchmark_cont.py [lines]
+Short lines, accented or not, are written as they are, without folding.
+"""
+
+# global imports
+import sys
+import time
+
+# local imports
+from getmyancestors.classes.constants import MAX_CONT, MAX_LINE
+from getmyancestors.classes.tree import cont, fold
+
+LINES = {
+    "ASCII": "2 PLAC Paris, Ile-de-France, France",
+    "accented": "2 PLAC Québec, Île-d'Orléans, Canada",
+    "long": "0 @N1@ NOTE " + "texte accentué " * 40,
+    "multi-line": "0 @N1@ NOTE première ligne\nseconde ligne",
+}
+
+
+def ascii_only(string):
+    """cont with its former fast path, for ASCII lines only"""
+    if len(string) <= MAX_LINE and string.isascii() and string.isprintable():
+        return string + "\n"
+    level = int(string[:1]) + 1
+    res = list()
+    max_len = MAX_LINE
+    for line in string.splitlines():
+        res.append(("\n%s CONC " % level).join(fold(line, max_len)))
+        max_len = MAX_CONT
+    return ("\n%s CONT " % level).join(res) + "\n"
+
+
+def timed(function, string, count):
+    """return the microseconds taken by a call of function on string"""
+    start = time.perf_counter()
+    for _ in range(count):
+        function(string)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for kind, string in LINES.items():
+        print(
+            "%-10s cont: %.2f µs, ASCII only: %.2f µs"
+            % (kind, timed(cont, string, count), timed(ascii_only, string, count))
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Time Tree.print with one and with several processes
+usage: PYTHONPATH=. python tests/benchmark_print.py [individuals] [processes]
+With at most one process per CPU, several processes are not slower.
+"""
+
+# global imports
+import io
+import os
+import sys
+import time
+
+# local imports
+from getmyancestors.classes.tree import Tree
+from getmyancestors.classes.gedcom import Gedcom
+
+
+def sample(count):
+    """return the text of a GEDCOM file with count individuals in couples"""
+    lines = ["0 HEAD", "1 CHAR UTF-8"]
+    for num in range(1, count + 1):
+        lines += [
+            "0 @I%s@ INDI" % num,
+            "1 NAME Jean%s /Dupont/" % num,
+            "1 SEX %s" % ("M" if num % 2 else "F"),
+            "1 BIRT",
+            "2 DATE %s" % (1900 - num % 300),
+            "2 PLAC Paris, Île-de-France, France",
+            "1 OCCU %s" % ("laboureur " * (num % 40 + 1)),
+            "1 NOTE @N%s@" % (num % 100 + 1),
+            "1 _FSFTID I%06d" % num,
+        ]
+        if num % 2:
+            lines.append("1 FAMS @F%s@" % num)
+        else:
+            lines.append("1 FAMS @F%s@" % (num - 1))
+    for num in range(1, count + 1, 2):
+        lines += ["0 @F%s@ FAM" % num, "1 HUSB @I%s@" % num]
+        if num + 1 <= count:
+            lines.append("1 WIFE @I%s@" % (num + 1))
+    for num in range(1, 101):
+        lines += ["0 @N%s@ NOTE Note %s" % (num, num), "1 CONT " + "texte " * 80]
+    lines.append("0 TRLR")
+    return "\n".join(lines) + "\n"
+
+
+def timed(tree, processes):
+    """return the seconds taken to print tree"""
+    start = time.perf_counter()
+    tree.print(io.StringIO(), processes=processes)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    tree = Tree()
+    ged = Gedcom(io.StringIO(sample(count)), tree)
+    for indi in ged.indi.values():
+        tree.indi[indi.fid] = indi
+    for fam in ged.fam.values():
+        tree.fam[(fam.husb_fid, fam.wife_fid)] = fam
+    tree.merge_notes()
+    tree.reset_num()
+    timed(tree, 1)
+    serial = min(timed(tree, 1) for _ in range(3))
+    parallel = min(timed(tree, processes) for _ in range(3))
+    print("%s individuals, %s CPU" % (count, os.cpu_count()))
+    print("1 process: %.2f s" % serial)
+    print("%s processes: %.2f s (%.2fx)" % (processes, parallel, serial / parallel))
+
+
+if __name__ == "__main__":
+    main()
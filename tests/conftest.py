@@ -0,0 +1,63 @@
+# global imports
+import io
+import os
+import pytest
+
+# local imports
+from getmyancestors.classes.tree import Tree
+from getmyancestors.classes.gedcom import Gedcom
+
+SAMPLE = os.path.join(os.path.dirname(__file__), "sample.ged")
+
+
+def load_sample(tree):
+    """read sample.ged into tree, its records keyed as in a downloaded tree"""
+    with open(SAMPLE, encoding="UTF-8") as file:
+        ged = Gedcom(file, tree)
+    for indi in ged.indi.values():
+        tree.indi[indi.fid] = indi
+    for fam in ged.fam.values():
+        tree.fam[(fam.husb_fid, fam.wife_fid)] = fam
+    tree.merge_notes()
+    tree.reset_num()
+    return tree
+
+
+def store(tree, directory):
+    """return a copy of tree stored in directory, through a snapshot, with
+    one object of each kind in memory
+    """
+    filename = os.path.join(directory, "tree.snapshot")
+    tree.save_snapshot(filename)
+    stored = Tree(storage=directory, cache_size=1)
+    stored.load_snapshot(filename)
+    return stored
+
+
+def gedcom(tree, **kwargs):
+    """return the GEDCOM text of tree"""
+    file = io.StringIO()
+    tree.print(file, **kwargs)
+    return file.getvalue()
+
+
+def canonical(text):
+    """return the records of a GEDCOM text, each as its first line and its
+    other lines sorted, without the date of the header: the order of the
+    facts, notes and sources of a record depends on hashing
+    """
+    records = list()
+    for line in text.splitlines():
+        if line.startswith("0 "):
+            records.append((line, []))
+        elif not line.startswith(("1 DATE", "2 TIME")) or records[-1][0] != "0 HEAD":
+            records[-1][1].append(line)
+    return [(first, sorted(lines)) for first, lines in records]
+
+
+@pytest.fixture
+def tree():
+    """the tree of sample.ged"""
+    tree = load_sample(Tree())
+    yield tree
+    tree.close()
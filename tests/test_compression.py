@@ -0,0 +1,71 @@
+# global imports
+import io
+import os
+import pytest
+
+# local imports
+from getmyancestors.classes import compression
+
+TEXT = "0 HEAD\n1 CHAR UTF-8\n0 @I1@ INDI\n1 NAME Hélène /Côté/\n0 TRLR\n"
+EXTENSIONS = [".gz", ".bz2", ".xz", ".zst"]
+
+
+def write(filename):
+    """write TEXT to filename, compressed as its extension says"""
+    file = compression.FileType("w", encoding="UTF-8")(filename)
+    file.write(TEXT)
+    file.close()
+
+
+def read(filename):
+    """return the text of filename, decompressed if it is compressed"""
+    file = compression.FileType("r", encoding="UTF-8")(filename)
+    text = file.read()
+    file.close()
+    return text
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS)
+def test_round_trip(tmp_path, extension):
+    if extension == ".zst":
+        pytest.importorskip("zstandard")
+    filename = str(tmp_path / ("tree.ged" + extension))
+    write(filename)
+    with open(filename, "rb") as file:
+        assert not file.read().startswith(b"0 HEAD")
+    assert read(filename) == TEXT
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS)
+def test_sniffing(tmp_path, extension):
+    if extension == ".zst":
+        pytest.importorskip("zstandard")
+    filename = str(tmp_path / ("tree.ged" + extension))
+    write(filename)
+    # compressed input is recognised by its first bytes, not its name
+    renamed = str(tmp_path / "tree.ged")
+    os.rename(filename, renamed)
+    file = compression.FileType("r", encoding="UTF-8")(renamed)
+    assert file.compression == compression.compression_of(filename)
+    assert file.read() == TEXT
+    file.close()
+
+
+def test_plain(tmp_path):
+    filename = str(tmp_path / "tree.ged")
+    write(filename)
+    with open(filename, encoding="UTF-8") as file:
+        assert file.read() == TEXT
+    file = compression.FileType("r", encoding="UTF-8")(filename)
+    assert not isinstance(file, compression.CompressedFile)
+    assert file.read() == TEXT
+    file.close()
+    # files that cannot be peeked at are not sniffed
+    stream = io.StringIO(TEXT)
+    assert compression.decompress(stream) is stream
+
+
+def test_compression_of():
+    assert compression.compression_of("tree.GED.GZ") == "gzip"
+    assert compression.compression_of("tree.zst") == "zstd"
+    assert compression.compression_of("tree.ged") is None
@@ -0,0 +1,63 @@
+# global imports
+import re
+import random
+import pytest
+
+# local imports
+from getmyancestors.classes.tree import cont
+
+# characters around which lines are folded or split: spaces, line breaks,
+# multi-byte UTF-8 characters
+ALPHABET = ["a", "b", " ", "\t", "\n", "\r", "é", "€", "😀", "xxxxx", "\x0b"]
+ALPHABET += ["\x1c", "\xa0", "\x85", "Z"]
+
+
+def reference_cont(string):
+    """cont as it was before it was optimized, byte by byte"""
+    level = int(string[:1]) + 1
+    lines = string.splitlines()
+    res = list()
+    max_len = 255
+    for line in lines:
+        c_line = line
+        to_conc = list()
+        while len(c_line.encode("utf-8")) > max_len:
+            index = min(max_len, len(c_line) - 2)
+            while (
+                len(c_line[:index].encode("utf-8")) > max_len
+                or re.search(r"[ \t\v]", c_line[index - 1 : index + 1])
+            ) and index > 1:
+                index -= 1
+            to_conc.append(c_line[:index])
+            c_line = c_line[index:]
+            max_len = 248
+        to_conc.append(c_line)
+        res.append(("\n%s CONC " % level).join(to_conc))
+        max_len = 248
+    return ("\n%s CONT " % level).join(res) + "\n"
+
+
+@pytest.mark.parametrize(
+    "string",
+    [
+        "1 NAME Jean /Dupont/",
+        "2 PLAC São Paulo, Brasil",
+        "1 NOTE ",
+        "0 @N1@ NOTE " + "word " * 120,
+        "0 @N1@ NOTE " + "é" * 300,
+        "0 @N1@ NOTE " + "x" * 254 + " " + "y" * 300,
+        "0 @N1@ NOTE first line\nsecond line\r\n\nfourth line",
+    ],
+)
+def test_cont(string):
+    assert cont(string) == reference_cont(string)
+
+
+def test_cont_random():
+    generator = random.Random(7)
+    for _ in range(5000):
+        length = generator.choice([1, 5, 50, 200, 260, 400, 1000, 3000])
+        string = generator.choice(["1 NOTE ", "2 PLAC ", "0 @N1@ NOTE "]) + "".join(
+            generator.choice(ALPHABET) for _ in range(generator.randint(0, length))
+        )
+        assert cont(string) == reference_cont(string), repr(string)
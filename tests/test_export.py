@@ -0,0 +1,133 @@
+# global imports
+import io
+import os
+import json
+import sqlite3
+import pytest
+
+# local imports
+from getmyancestors.classes.export import (
+    JsonLines,
+    coordinates,
+    fact_dict,
+    write_arrow,
+    write_outputs,
+    write_sqlite,
+)
+from getmyancestors.classes.tree import Tree
+
+
+def test_coordinates():
+    assert coordinates(("N48.8", "E2.3")) == (48.8, 2.3)
+    assert coordinates(("S33.9", "W70.6")) == (-33.9, -70.6)
+    assert coordinates(("48.8", "-2.3")) == (48.8, -2.3)
+    assert coordinates(None) is None
+    assert coordinates(("", "E2.3")) is None
+    assert coordinates((None, "E2.3")) is None
+
+
+def test_write_outputs(capsys):
+    written = list()
+
+    def fail():
+        raise OSError("the pyarrow package is required")
+
+    outputs = [("Parquet", fail), ("snapshot", lambda: written.append("snapshot"))]
+    assert write_outputs(outputs) == 1
+    assert written == ["snapshot"]
+    assert "Parquet" in capsys.readouterr().err
+
+
+def test_json_lines(tree):
+    file = io.StringIO()
+    JsonLines(file).write_tree(tree)
+    text = file.getvalue()
+    assert "Québec" in text
+    records = [json.loads(line) for line in text.splitlines()]
+    kinds = ["person"] * 4 + ["family", "source"] + ["note"] * 3
+    assert [x["type"] for x in records] == kinds
+    persons = {x["id"]: x for x in records if x["type"] == "person"}
+    assert persons["AAAA-001"]["name"]["surname"] == "Dupont"
+    assert persons["AAAA-003"]["parents"] == [["AAAA-001", "AAAA-002"]]
+    (family,) = [x for x in records if x["type"] == "family"]
+    assert family["children"] == ["AAAA-003", "AAAA-004"]
+    notes = {x["num"]: x["text"] for x in records if x["type"] == "note"}
+    assert persons["AAAA-001"]["notes"][0] in notes
+
+
+def test_json_lines_spool():
+    class File(io.StringIO):
+        flushes = 0
+
+        def flush(self):
+            self.flushes += 1
+
+    file = File()
+    tree = Tree(spool=JsonLines(file))
+    tree.add_note("a note")
+    # each record is flushed as soon as it is written
+    assert file.flushes == 1
+    assert json.loads(file.getvalue()) == {"type": "note", "num": 1, "text": "a note"}
+    tree.close()
+
+
+def test_fact_dict(tree):
+    (fact,) = [fact for fact in tree.indi["AAAA-002"].facts if fact.map]
+    data = fact_dict(fact)
+    assert (data["latitude"], data["longitude"]) == (46.8139, -71.208)
+
+
+def test_write_sqlite(tree, tmp_path):
+    filename = str(tmp_path / "tree.db")
+    write_sqlite(tree, filename)
+    # a second export replaces the tables
+    write_sqlite(tree, filename)
+    connection = sqlite3.connect(filename)
+    persons = connection.execute(
+        "SELECT fid, surname, birth_year FROM persons ORDER BY fid"
+    ).fetchall()
+    assert len(persons) == 4 and persons[0] == ("AAAA-001", "Dupont", 1701)
+    children = connection.execute(
+        "SELECT child FROM children JOIN families ON family = num "
+        "WHERE husband = 'AAAA-001' ORDER BY child"
+    ).fetchall()
+    assert children == [("AAAA-003",), ("AAAA-004",)]
+    places = connection.execute("SELECT place, longitude FROM places").fetchall()
+    assert ("Québec, Canada", -71.208) in places
+    (notes,) = connection.execute("SELECT count(*) FROM notes").fetchone()
+    assert notes == len(tree.notes)
+    connection.close()
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+def test_write_arrow(tree, tmp_path, format):
+    pyarrow = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    write_arrow(tree, str(tmp_path), format)
+    tables = dict()
+    for name in ("persons", "facts", "edges"):
+        filename = os.path.join(str(tmp_path), "%s.%s" % (name, format))
+        if format == "parquet":
+            tables[name] = pyarrow.parquet.read_table(filename).to_pylist()
+        else:
+            with open(filename, "rb") as file:
+                tables[name] = pyarrow.ipc.open_stream(file).read_all().to_pylist()
+    persons = {row["fid"]: row for row in tables["persons"]}
+    assert sorted(persons) == ["AAAA-001", "AAAA-002", "AAAA-003", "AAAA-004"]
+    assert persons["AAAA-001"]["surname"] == "Dupont"
+    assert persons["AAAA-001"]["birth_year"] == 1701
+    assert persons["AAAA-002"]["birth_place"] == "Québec, Canada"
+    longitudes = {
+        row["person"]: row["longitude"]
+        for row in tables["facts"]
+        if row["longitude"] is not None
+    }
+    assert longitudes == {"AAAA-001": 2.3522, "AAAA-002": -71.208}
+    assert sorted((row["parent"], row["child"]) for row in tables["edges"]) == [
+        ("AAAA-001", "AAAA-003"),
+        ("AAAA-001", "AAAA-004"),
+        ("AAAA-002", "AAAA-003"),
+        ("AAAA-002", "AAAA-004"),
+    ]
@@ -0,0 +1,34 @@
+# local imports
+from getmyancestors.classes.graph import Graph, pack
+
+
+def known(fid):
+    return True
+
+
+def test_pack():
+    assert pack(-1, -1, 0) == 1
+    assert len({pack(a, b) for a in range(-1, 3) for b in range(-1, 3)}) == 16
+    assert pack(0, 1) != pack(1, 0)
+
+
+def test_trios():
+    graph = Graph()
+    graph.add_trio("F", "M", "C", known)
+    graph.add_trio("F", "M", "C", known)
+    graph.add_trio(None, "M", "D", known)
+    assert len(graph.trios) == 2
+    assert graph.parents(["C", "D"]) == [("F", "M", "C"), (None, "M", "D")]
+    assert graph.children(["M"]) == [("F", "M", "C"), (None, "M", "D")]
+    assert graph.children(["F"]) == [("F", "M", "C")]
+
+
+def test_couples():
+    graph = Graph()
+    graph.add_couple("F", "M", "R1", known)
+    graph.add_couple("F", "M", "R1", known)
+    # two relationships of the same persons
+    graph.add_couple("F", "M", "R2", known)
+    graph.add_couple("F", "M", "R2", known)
+    assert graph.spouses(["F"]) == [("F", "M", "R1"), ("F", "M", "R2")]
+    assert graph.spouses(["M"]) == graph.spouses(["F"])
@@ -0,0 +1,43 @@
+# local imports
+from getmyancestors.classes.tree import EMPTY, Fam, Indi, Tree
+
+
+def test_empty():
+    tree = Tree()
+    indi, other = Indi("AAAA-001", tree), Indi("AAAA-002", tree)
+    assert indi.notes is EMPTY and other.facts is EMPTY
+    assert indi._notes is None
+    assert not indi.notes and len(indi.notes) == 0
+    tree.close()
+
+
+def test_mutable():
+    tree = Tree()
+    indi = Indi("AAAA-001", tree)
+    indi.mutable("notes").add(1)
+    indi.mutable("notes").update((2, 3))
+    assert indi.notes == {1, 2, 3} and isinstance(indi._notes, set)
+    assert indi.mutable("notes") is indi.notes
+    indi.mutable("notes").discard(4)
+    indi.mutable("notes").remove(3)
+    assert indi.notes == {1, 2}
+    assert Indi("AAAA-002", tree).facts is EMPTY
+    tree.close()
+
+
+def test_augmented_assignment():
+    tree = Tree()
+    fam = Fam("AAAA-001", "AAAA-002", tree)
+    fam.chil_fid |= {"AAAA-003", "AAAA-004"}
+    assert type(fam._chil_fid) is set
+    fam.add_child("AAAA-005")
+    fam.chil_fid -= {"AAAA-003"}
+    assert fam.chil_fid == {"AAAA-004", "AAAA-005"}
+    fam.chil_fid &= {"AAAA-005", "AAAA-006"}
+    assert fam.chil_fid == {"AAAA-005"}
+    fam.chil_fid -= {"AAAA-005"}
+    assert fam.chil_fid is EMPTY and fam._chil_fid is None
+    fam.chil_fid = frozenset({"AAAA-007"})
+    fam.add_child("AAAA-008")
+    assert fam.chil_fid == {"AAAA-007", "AAAA-008"}
+    tree.close()
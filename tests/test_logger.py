@@ -0,0 +1,43 @@
+# global imports
+import io
+import json
+import logging
+import threading
+
+# local imports
+from getmyancestors.classes.logger import QueueLogger
+
+
+def test_text():
+    first, second = io.StringIO(), io.StringIO()
+    logger = QueueLogger("test_text", [first, second])
+    logger.log(logging.INFO, "Downloading", url="/platform/tree/persons")
+    logger.stop()
+    assert first.getvalue() == second.getvalue()
+    assert first.getvalue().endswith("]: Downloading\n")
+    # stopping again does nothing
+    logger.stop()
+
+
+def test_json():
+    stream = io.StringIO()
+    logger = QueueLogger("test_json", [stream], "json")
+
+    def log(thread):
+        for num in range(100):
+            logger.log(logging.WARNING, "request %s" % num, phase=thread, status=200)
+
+    threads = [threading.Thread(target=log, args=(x,)) for x in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logger.stop()
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(records) == 400
+    assert records[0]["level"] == "WARNING" and records[0]["status"] == 200
+    assert "url" not in records[0]
+    # the records of each thread are written in order
+    for thread in range(4):
+        messages = [x["message"] for x in records if x["phase"] == thread]
+        assert messages == ["request %s" % num for num in range(100)]
@@ -0,0 +1,64 @@
+# global imports
+import io
+import json
+import pytest
+
+# local imports
+from getmyancestors.classes.metrics import Metrics, endpoint
+
+
+@pytest.mark.parametrize(
+    "url, family",
+    [
+        ("/platform/tree/persons?pids=AAAA-001,AAAA-002", "persons"),
+        ("/platform/tree/persons/AAAA-001/sources", "sources"),
+        ("/platform/tree/persons/AAAA-001/notes", "notes"),
+        ("/platform/tree/persons/AAAA-001/changes", "changes"),
+        ("/platform/tree/couple-relationships/REL1", "couple-relationships"),
+        ("/platform/tree/couple-relationships/REL1/sources", "sources"),
+        ("/platform/tree/couple-relationships/REL1/notes", "notes"),
+        ("/platform/tree/couple-relationships/REL1/changes", "changes"),
+        ("/platform/memories/memories/MEM1", "memories"),
+        (
+            "/service/tree/tree-data/reservations/person/AAAA-001/ordinances",
+            "ordinances",
+        ),
+        ("/platform/users/current", "other"),
+    ],
+)
+def test_endpoint(url, family):
+    assert endpoint(url) == family
+
+
+def test_metrics():
+    metrics = Metrics()
+    url = "/platform/tree/persons/AAAA-001/notes"
+    metrics.request(url)
+    metrics.retry(url)
+    metrics.response(url, 429, latency=0.07)
+    metrics.response(url, 200, latency=0.3, size=100)
+    metrics.request("/platform/tree/persons?pids=AAAA-001")
+    metrics.response("/platform/tree/persons?pids=AAAA-001", 200, 0, 50, True)
+    assert metrics.requests == 2
+    assert metrics.totals() == {
+        "count": 2,
+        "retries": 1,
+        "cache_hits": 1,
+        "cache_misses": 2,
+    }
+    notes = metrics.as_dict()["notes"]
+    assert notes["status"] == {"429": 1, "200": 1}
+    assert notes["bytes"] == 100
+    assert notes["latency"]["buckets"]["0.1"] == 1
+    assert notes["latency"]["buckets"]["0.5"] == 1
+    file = io.StringIO()
+    metrics.dump(file)
+    assert json.loads(file.getvalue()) == metrics.as_dict()
+    file = io.StringIO()
+    metrics.dump(file, "prometheus")
+    lines = file.getvalue().splitlines()
+    assert 'getmyancestors_requests_total{endpoint="notes"} 1' in lines
+    assert (
+        'getmyancestors_request_duration_seconds_bucket{endpoint="notes",le="+Inf"} 2'
+        in lines
+    )
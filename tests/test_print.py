@@ -0,0 +1,52 @@
+# global imports
+import io
+import os
+import threading
+
+# local imports
+from getmyancestors.classes import tree as tree_module
+from getmyancestors.classes.tree import Tree
+from conftest import canonical, gedcom, load_sample, store
+
+
+def test_print(tree):
+    text = gedcom(tree)
+    assert text.startswith("0 HEAD\n") and text.endswith("0 TRLR\n")
+    file = io.BytesIO()
+    tree.print(file, buffer_size=10)
+    assert file.getvalue().decode("utf-8") == text
+
+
+def test_parallel_print(tree, tmp_path, monkeypatch):
+    monkeypatch.setattr(tree_module, "PRINT_CHUNK", 2)
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    expected = canonical(gedcom(tree))
+    assert canonical(gedcom(tree, processes=2)) == expected
+    # printed by this process
+    stored = store(tree, str(tmp_path))
+    try:
+        assert canonical(gedcom(stored, processes=3)) == expected
+    finally:
+        stored.close()
+
+
+def test_parallel_print_threads(tree, monkeypatch):
+    # the records are only set in the processes rendering them
+    monkeypatch.setattr(tree_module, "PRINT_CHUNK", 2)
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    expected = canonical(gedcom(tree))
+    other = load_sample(Tree())
+    texts = dict()
+
+    def run(name, printed):
+        texts[name] = gedcom(printed, processes=2)
+
+    threads = [
+        threading.Thread(target=run, args=(name, printed))
+        for name, printed in (("tree", tree), ("other", other))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert canonical(texts["tree"]) == canonical(texts["other"]) == expected
@@ -0,0 +1,46 @@
+# local imports
+from getmyancestors.classes.scheduler import Scheduler
+
+
+def test_increase():
+    scheduler = Scheduler(initial=4, maximum=6)
+    # about one slot per round of limit requests
+    for _ in range(4):
+        scheduler.success(0.1)
+    assert scheduler.limit == 4 and scheduler._limit > 4.9
+    scheduler.success(0.1)
+    assert scheduler.limit == 5
+    for _ in range(50):
+        scheduler.success(0.1)
+    assert scheduler.limit == 6
+
+
+def test_slow_requests():
+    scheduler = Scheduler(initial=4, target_latency=1)
+    for _ in range(10):
+        scheduler.success(2)
+    assert scheduler.limit == 4
+
+
+def test_decrease():
+    scheduler = Scheduler(initial=16, minimum=3)
+    scheduler.success(10)
+    scheduler.failure()
+    assert scheduler.limit == 8
+    # errors of the same round of requests count as one
+    scheduler.failure()
+    assert scheduler.limit == 8
+    scheduler.last_backoff = 0
+    scheduler.failure()
+    scheduler.last_backoff = 0
+    scheduler.failure()
+    assert scheduler.limit == 3
+    assert scheduler.error_rate() == 0.8
+
+
+def test_slot():
+    scheduler = Scheduler(initial=2)
+    with scheduler.slot():
+        with scheduler.slot():
+            assert scheduler.in_flight == 2
+    assert scheduler.in_flight == 0
@@ -0,0 +1,85 @@
+# global imports
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+# local imports
+from getmyancestors.classes.session import Session
+from getmyancestors.classes.scheduler import Scheduler
+
+
+class Response:
+    """response of a fake request"""
+
+    def __init__(self, num):
+        self.num = num
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def hedging(delays, ratio=0.5):
+    """return a Session hedging requests, without logging in
+    :param delays: seconds taken by each request sent, in order, an
+                   exception instance to raise it instead
+    """
+    fs = Session.__new__(Session)
+    fs.hedge = True
+    fs.hedge_percentile = 95
+    fs.hedge_ratio = ratio
+    fs.timeout = 5
+    fs.hedge_lock = threading.Lock()
+    fs.hedge_requests = fs.hedged = 0
+    fs.hedge_executor = ThreadPoolExecutor(max_workers=4)
+    fs.scheduler = Scheduler()
+    for _ in range(20):
+        fs.scheduler.success(0.05)
+    fs.write_log = lambda *args, **kwargs: None
+    fs.responses = list()
+    lock = threading.Lock()
+
+    def get(url, timeout, headers):
+        with lock:
+            response = Response(len(fs.responses))
+            fs.responses.append(response)
+        delay = delays[response.num]
+        if isinstance(delay, Exception):
+            raise delay
+        time.sleep(delay)
+        return response
+
+    fs.get = get
+    return fs
+
+
+def test_fast_request():
+    fs = hedging([0])
+    assert fs.hedged_get("url", {}).num == 0
+    assert fs.hedged == 0 and len(fs.responses) == 1
+
+
+def test_first_answer_wins():
+    fs = hedging([1, 0])
+    start = time.time()
+    response = fs.hedged_get("url", {})
+    assert response.num == 1 and time.time() - start < 0.5
+    assert fs.hedged == 1
+    # the slow request is closed once it ends
+    fs.hedge_executor.shutdown()
+    assert fs.responses[0].closed and not response.closed
+
+
+def test_duplicate_fails():
+    fs = hedging([0.2, requests.exceptions.ConnectionError()])
+    assert fs.hedged_get("url", {}).num == 0
+
+
+def test_budget():
+    fs = hedging([0.2] * 4, ratio=0.5)
+    fs.hedged_get("url", {})
+    assert fs.hedged == 1 and len(fs.responses) == 2
+    # a duplicate would be 2 of 2 requests
+    fs.hedged_get("url", {})
+    assert fs.hedged == 1 and len(fs.responses) == 3
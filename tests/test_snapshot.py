@@ -0,0 +1,69 @@
+# global imports
+import os
+import pickle
+import pytest
+
+# local imports
+import getmyancestors
+from getmyancestors.classes.tree import Tree
+from getmyancestors.classes import snapshot
+from conftest import canonical, gedcom
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_round_trip(tree, tmp_path, lazy):
+    filename = str(tmp_path / "tree.snap")
+    tree.save_snapshot(filename)
+    assert snapshot.is_snapshot(filename)
+    loaded = Tree()
+    loaded.load_snapshot(filename, lazy=lazy)
+    try:
+        assert canonical(gedcom(loaded)) == canonical(gedcom(tree))
+        indi = loaded.indi["AAAA-003"]
+        # shared records are still shared once loaded
+        assert indi.famc_num == {loaded.fam[("AAAA-001", "AAAA-002")].num}
+        ((source, quote),) = indi.sources
+        assert source is loaded.sources["SRC-0001"]
+        assert quote == "page 2"
+        assert indi.notes <= set(loaded.notes)
+    finally:
+        loaded.close()
+
+
+def test_counters(tree, tmp_path):
+    # the sample tree numbers its records itself, like a merged tree
+    filename = str(tmp_path / "tree.snap")
+    tree.save_snapshot(filename)
+    loaded = Tree()
+    loaded.load_snapshot(filename)
+    assert next(loaded.indi_nums) > max(indi.num for indi in tree.indi.values())
+    assert next(loaded.fam_nums) > max(fam.num for fam in tree.fam.values())
+    assert next(loaded.note_nums) > max(note.num for note in tree.notes)
+    assert next(loaded.source_nums) > max(s.num for s in tree.sources.values())
+
+
+def test_other_version(tree, tmp_path, monkeypatch):
+    filename = str(tmp_path / "tree.snap")
+    tree.save_snapshot(filename)
+    monkeypatch.setattr(getmyancestors, "__version__", "0.0.1")
+    with pytest.raises(ValueError):
+        Tree().load_snapshot(filename)
+
+
+class Payload:
+    def __reduce__(self):
+        return (os.remove, ("never removed",))
+
+
+def test_unsafe_class(tmp_path):
+    filename = str(tmp_path / "crafted.snap")
+    data = pickle.dumps(Payload())
+    with open(filename, "wb") as file:
+        file.write(
+            snapshot.HEADER.pack(
+                snapshot.MAGIC, snapshot.VERSION, snapshot.HEADER.size, len(data)
+            )
+        )
+        file.write(data)
+    with pytest.raises(pickle.UnpicklingError):
+        Tree().load_snapshot(filename)
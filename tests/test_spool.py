@@ -0,0 +1,46 @@
+# global imports
+import io
+
+# local imports
+from getmyancestors.classes.tree import Tree
+from getmyancestors.classes.spool import Spool, Tee
+from conftest import canonical, gedcom
+
+
+def assembled(spool, tree):
+    """return the GEDCOM text assembled from spool"""
+    file = io.StringIO()
+    spool.assemble(tree, file, buffer_size=100)
+    spool.remove()
+    return file.getvalue()
+
+
+def test_assemble(tree, tmp_path):
+    spools = [Spool(str(tmp_path / "first")), Spool(str(tmp_path / "second"))]
+    tee = Tee(spools)
+    kinds = {"Indi": "indi", "Fam": "fam", "Source": "sour", "Note": "note"}
+    # the records are written as they are completed, in any order
+    for record in reversed(list(tree.records())):
+        tee.write(kinds[type(record).__name__], record)
+    expected = canonical(gedcom(tree))
+    for spool in spools:
+        text = assembled(spool, tree)
+        assert text.startswith("0 HEAD\n") and text.endswith("0 TRLR\n")
+        assert sorted(canonical(text)) == sorted(expected)
+
+
+def test_resume_from_snapshot(tree, tmp_path):
+    filename = str(tmp_path / "tree.snap")
+    tree.save_snapshot(filename)
+    spool = Spool(str(tmp_path / "spool"))
+    resumed = Tree(spool=spool)
+    resumed.load_snapshot(filename)
+    # the crawl then finalizes every individual and family of the tree
+    for fid in resumed.indi:
+        resumed.finalize_indi(fid)
+    for key in resumed.fam:
+        resumed.finalize_fam(key)
+    records = canonical(assembled(spool, resumed))
+    firsts = [first for first, _ in records]
+    assert len(firsts) == len(set(firsts))
+    assert sorted(records) == sorted(canonical(gedcom(tree)))
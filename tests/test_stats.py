@@ -0,0 +1,53 @@
+# global imports
+import pytest
+
+# local imports
+from getmyancestors.classes.tree import Indi, Tree
+
+
+@pytest.fixture
+def stats():
+    """the stats module, which needs numpy"""
+    pytest.importorskip("numpy")
+    from getmyancestors.classes import stats
+
+    return stats
+
+
+def test_report(stats, tree):
+    table = stats.PersonTable(tree.indi[fid] for fid in tree.indi)
+    report = table.report(["AAAA-003", "AAAA-004"])
+    assert report["genders"] == {"U": 0, "M": 2, "F": 2}
+    assert (report["birth_years"], report["death_years"]) == (3, 1)
+    generations = report["generations"]
+    assert [x["distinct"] for x in generations] == [2, 2]
+    assert [x["slots"] for x in generations] == [2, 4]
+    assert generations[1]["completeness"] == 1.0
+    # the siblings share their parents
+    assert generations[1]["implex"] == 0.5
+    assert report["ancestors"] == 2 and report["pedigree_collapse"] == 0.5
+    lifespans = report["lifespans"]
+    assert (lifespans["known"], lifespans["mean"]) == (1, 60.0)
+    assert lifespans["mean_by_gender"] == {"M": 60.0}
+    assert {"from": 60, "count": 1} in lifespans["histogram"]
+    assert report["surnames"] == [("Dupont", 3), ("Martin", 1)]
+
+
+def test_pedigree(stats):
+    # the parents of the root are siblings
+    tree = Tree()
+    parents = {"R": ("A", "B"), "A": ("C", "D"), "B": ("C", "D"), "C": (None, "E")}
+    indis = list()
+    for fid in "RABCDE":
+        indi = Indi(fid, tree)
+        if fid in parents:
+            indi.mutable("famc_fid").add(parents[fid])
+        indis.append(indi)
+    table = stats.PersonTable(indis)
+    generations = table.pedigree(table.roots())
+    assert [x["distinct"] for x in generations] == [1, 2, 2, 1]
+    assert [x["slots"] for x in generations] == [1, 2, 4, 2]
+    assert [x["completeness"] for x in generations] == [1, 1, 1, 0.25]
+    assert generations[2]["implex"] == 0.5
+    assert table.depth.tolist() == [0, 1, 1, 2, 2, 3]
+    tree.close()
@@ -0,0 +1,135 @@
+# local imports
+from getmyancestors.classes.tree import Tree, Fam, Indi, Note
+from getmyancestors.classes.gedcom import Gedcom
+from conftest import SAMPLE, canonical, gedcom, store
+
+
+def count_dumps(database):
+    """count the values pickled by database"""
+    dumps = database.dumps
+    counts = {"dumps": 0}
+
+    def counted(value):
+        counts["dumps"] += 1
+        return dumps(value)
+
+    database.dumps = counted
+    return counts
+
+
+def test_disk_dict(tmp_path):
+    tree = Tree(storage=str(tmp_path), cache_size=1)
+    try:
+        values = tree.database.dict("records")
+        for i in range(10):
+            values["key%s" % i] = [i]
+        values[("a", None)] = ["tuple key"]
+        assert len(values) == 11
+        assert list(values)[:3] == ["key0", "key1", "key2"]
+        assert list(values)[-1] == ("a", None)
+        assert values["key3"] == [3]
+        assert "key9" in values and "missing" not in values
+        # a pinned value stays in memory and is written with its changes
+        with values.pinned("key3") as value:
+            value.append("changed")
+            for i in range(10):
+                values["key%s" % i]
+            assert values["key3"] is value
+        for i in range(10):
+            values["key%s" % i]
+        assert values["key3"] == [3, "changed"]
+        del values["key0"]
+        assert "key0" not in values and len(values) == 10
+    finally:
+        tree.close()
+
+
+def test_disk_dict_writes(tmp_path):
+    tree = Tree(storage=str(tmp_path), cache_size=1)
+    try:
+        values = tree.database.dict("records")
+        counts = count_dumps(tree.database)
+        for i in range(10):
+            values["key%s" % i] = [i]
+        # a new value is only pickled when it leaves the cache
+        assert counts["dumps"] == 9
+        for _ in range(3):
+            for i in range(10):
+                assert values["key%s" % i] == [i]
+        # the values read and not modified are not written again
+        assert counts["dumps"] == 10
+        tree.modify(values, "key4", list.append, "changed")
+        values["key5"]
+        assert counts["dumps"] == 11
+    finally:
+        tree.close()
+
+
+def test_disk_dict_references(tmp_path):
+    tree = Tree(storage=str(tmp_path), cache_size=1)
+    try:
+        values = tree.database.dict("records")
+        tree.fam[("F", "M")] = Fam("F", "M", tree, 1)
+        tree.note_index["text"] = Note("text", tree)
+        values["I"] = {"fam": tree.fam[("F", "M")], "note": tree.note_index["text"]}
+        # evict the first ones
+        values["J"] = {}
+        tree.fam[("F", None)] = Fam("F", None, tree, 2)
+        tree.note_index["other"] = Note("other", tree)
+        assert "I" not in values.cache
+        # families and notes are stored apart and referenced by their key
+        assert values["I"]["fam"] is tree.fam[("F", "M")]
+        assert values["I"]["note"] is tree.note_index["text"]
+    finally:
+        tree.close()
+
+
+def test_ordered_values(tmp_path):
+    tree = Tree(storage=str(tmp_path), cache_size=2)
+    try:
+        for num in (3, 1, 4, 5, 2):
+            tree.indi["I%s" % num] = Indi("I%s" % num, tree, num)
+        loads = {"loads": 0}
+        loader = tree.database.loads
+
+        def counted(data):
+            loads["loads"] += 1
+            return loader(data)
+
+        tree.database.loads = counted
+        assert [indi.num for indi in tree.records()] == [1, 2, 3, 4, 5]
+        # the cached individuals are not loaded, the others once
+        assert loads["loads"] == 3
+    finally:
+        tree.close()
+
+
+def test_disk_list(tmp_path):
+    tree = Tree(storage=str(tmp_path), cache_size=2)
+    try:
+        notes = tree.database.list("list")
+        for i in range(11):
+            notes.append(Note("note %s" % i, num=i + 1))
+        assert len(notes) == 11
+        assert len(notes.cache) == 2
+        assert [note.text for note in notes] == ["note %s" % i for i in range(11)]
+    finally:
+        tree.close()
+
+
+def test_gedcom_notes(tmp_path):
+    tree = Tree(storage=str(tmp_path), cache_size=1)
+    try:
+        with open(SAMPLE, encoding="UTF-8") as file:
+            Gedcom(file, tree)
+        assert all(note.text for note in tree.notes)
+    finally:
+        tree.close()
+
+
+def test_tree(tmp_path, tree):
+    stored = store(tree, str(tmp_path))
+    try:
+        assert canonical(gedcom(stored)) == canonical(gedcom(tree))
+    finally:
+        stored.close()
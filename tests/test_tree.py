@@ -0,0 +1,73 @@
+# global imports
+from concurrent.futures import ThreadPoolExecutor
+
+# local imports
+from getmyancestors.classes.constants import LOCK_STRIPES
+from getmyancestors.classes.tree import Fam, Indi, Source, Tree
+
+
+def test_intern(tree, tmp_path):
+    place = "".join(["Paris, ", "France"])
+    assert tree.intern(place) == place and tree.intern(None) is None
+    assert tree.intern("".join(["Paris, ", "France"])) is tree.intern(place)
+    location = tree.intern(tuple(float(x) for x in ("48.8", "2.3")))
+    assert tree.intern(tuple(float(x) for x in ("48.8", "2.3"))) is location
+    # the surnames read from the GEDCOM file are shared
+    jean, pierre = tree.indi["AAAA-001"].name, tree.indi["AAAA-003"].name
+    assert jean.surname is pierre.surname
+    stored = Tree(storage=str(tmp_path))
+    assert stored.intern(place) is place
+    stored.close()
+
+
+class Recorder:
+    """spool keeping the records written to it"""
+
+    def __init__(self):
+        self.records = list()
+
+    def write(self, kind, record):
+        self.records.append((kind, record))
+
+
+def test_add_note():
+    spool = Recorder()
+    tree = Tree(spool=spool)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        notes = list(
+            executor.map(tree.add_note, ["shared text", " shared text\n"] * 50)
+        )
+    note = tree.add_note("another text")
+    assert all(x is notes[0] for x in notes)
+    assert notes[0].text == "shared text"
+    assert tree.notes == [notes[0], note] and (notes[0].num, note.num) == (1, 2)
+    assert spool.records == [("note", notes[0]), ("note", note)]
+    tree.close()
+
+
+def test_numbers():
+    first, second = Tree(), Tree()
+    assert [Indi(None, first).num, Indi(None, first).num] == [1, 2]
+    assert Fam(None, None, first).num == 1 and Source(None, first).num == 1
+    # each tree numbers its own records
+    assert Indi(None, second).num == 1 and Fam(None, None, second).num == 1
+    assert Indi(None, first, num=10).num == 10 and Indi(None, first).num == 3
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        nums = list(executor.map(lambda x: Indi(None, second).num, range(1000)))
+    assert sorted(nums) == list(range(2, 1002))
+    first.close()
+    second.close()
+
+
+def test_lock_for():
+    tree = Tree()
+    assert tree.lock_for("AAAA-001") is tree.lock_for("AAAA-001")
+    assert tree.lock_for(("AAAA-001", None)) is tree.lock_for(("AAAA-001", None))
+    fids = ["AAAA-%04d" % num for num in range(4000)]
+    assert len({id(tree.lock_for(fid)) for fid in fids}) == LOCK_STRIPES
+    sources = [{"id": "S%s" % (num % 10)} for num in range(1000)]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        added = list(executor.map(tree.add_source, sources))
+    assert len(tree.sources) == 10 and len({id(x) for x in added}) == 10
+    assert sorted(x.num for x in tree.sources.values()) == list(range(1, 11))
+    tree.close()